@@ -3,6 +3,13 @@ DressGuard Configuration
 Central configuration for models, compliance rules, and application settings
 """
 
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from utils.label_trie import build_trie, normalize_words
+
 # ============================================================================
 # Model Configuration
 # ============================================================================
@@ -10,6 +17,7 @@ Central configuration for models, compliance rules, and application settings
 # Models are now discovered dynamically from the models/ folder
 # Just drop your .pt files in models/ and they'll be auto-detected
 MODELS_FOLDER = "models"  # Folder containing YOLO model files
+MODEL_DISCOVERY_TTL_SECONDS = 60  # How long discovery results are trusted before re-checking the folder
 DEFAULT_MODEL = None      # Will automatically use the first discovered model
 
 # ============================================================================
@@ -20,26 +28,61 @@ DEFAULT_MODEL = None      # Will automatically use the first discovered model
 # Your models detect: Full Sleeves Shirt, Half Sleeves Shirt, ID Card, Kurti, Pants, Shorts, T-Shirt
 
 # Compliant clothing items (approved for wear) - must match model classes
-COMPLIANT_CLOTHES = {
+COMPLIANT_CLOTHES = frozenset({
     "full sleeves shirt",  # Actual model class
     "half sleeves shirt",  # Actual model class
     "pants",               # Actual model class
     "kurti",               # Actual model class
     "id card"              # Actual model class
-}
+})
 
 # Explicitly non-compliant items (prohibited) - must match model classes
-NON_COMPLIANT_CLOTHES = {
+NON_COMPLIANT_CLOTHES = frozenset({
     "t-shirt",  # Actual model class
     "shorts"    # Actual model class
-}
+})
+
+# Alternate spellings mapped onto a canonical compliant class
+COMPLIANT_VARIANTS = MappingProxyType({
+    "kurti": ("kurta", "kurthi"),
+    "id card": ("identity card",),
+})
+
+
+def normalize_label(name: str) -> str:
+    """Normalize a class name for lookups (lowercase, punctuation treated as a space)"""
+    return " ".join(normalize_words(name))
+
+
+# Pre-normalized lookup tables, built once at import so per-detection
+# classification is a single dict/set lookup instead of repeated string work
+def _build_canonical_labels() -> dict:
+    """Map every normalized class name and variant to its canonical label"""
+    labels = {}
+    for label in COMPLIANT_CLOTHES | NON_COMPLIANT_CLOTHES:
+        labels[normalize_label(label)] = label
+    for label, variants in COMPLIANT_VARIANTS.items():
+        for variant in variants:
+            labels[normalize_label(variant)] = label
+    return labels
+
+
+CANONICAL_LABELS = _build_canonical_labels()
+COMPLIANT_FROZEN = frozenset(map(normalize_label, COMPLIANT_CLOTHES))
+NON_COMPLIANT_FROZEN = frozenset(map(normalize_label, NON_COMPLIANT_CLOTHES))
+
+# Word-level trie over every canonical label and variant (built once)
+LABEL_TRIE = build_trie({
+    **{label: [] for label in COMPLIANT_CLOTHES | NON_COMPLIANT_CLOTHES},
+    **COMPLIANT_VARIANTS,
+})
 
 # Compliance Rules
-COMPLIANCE_RULES = {
+COMPLIANCE_RULES = MappingProxyType({
     "min_confidence": 0.5,           # Minimum confidence threshold for detections
     "require_all_compliant": True,   # All detected items must be compliant
     "strict_mode": False,            # If True, unknown items are non-compliant
-}
+})
 
 # ============================================================================
 # Application Configuration
@@ -47,7 +90,7 @@ COMPLIANCE_RULES = {
 
 # File Upload Settings
 MAX_FILE_SIZE_MB = 10
-ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+ALLOWED_IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".bmp", ".webp"})
 MAX_IMAGE_DIMENSION = 4096
 MIN_IMAGE_DIMENSION = 50
 
@@ -60,7 +103,12 @@ WEBCAM_DETECTION_INTERVAL = 2.0      # Seconds between YOLO detections
 WEBCAM_ENABLE_DISTANCE_CHECK = False # Distance checking disabled - detection runs continuously
 WEBCAM_FPS_LIMIT = 100               # Max FPS for webcam stream (actual will be lower)
 WEBCAM_JPEG_QUALITY = 75             # JPEG quality (0-100, lower = faster but lower quality)
+WEBCAM_GPU_JPEG = False              # Encode stream frames with nvJPEG on the GPU (torchvision + CUDA)
 WEBCAM_SKIP_FRAMES = 0               # Skip N frames between processing (0 = process all frames, 1 = skip every other, 2 = skip 2 out of 3)
+WEBCAM_SCENE_HASH_THRESHOLD = 2      # Reuse last detections if the frame's dHash differs by <= N bits (-1 = disabled)
+WEBCAM_MAX_REUSED_FRAMES = 30        # Force a fresh detection after this many reused frames
+WEBCAM_BATCH_SIZE = 1                # Frames detected per forward pass (>1 raises GPU throughput but adds ~1 frame of latency each)
+FACE_DET_SIZE = 320                  # InsightFace detector input side (640 = full res; 320 is ~4x cheaper, fine for one person at webcam distance)
 
 # API Settings
 API_TITLE = "DressGuard API"
@@ -78,8 +126,70 @@ LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 # Model Performance Settings
 ENABLE_GPU = True                    # Use GPU if available
-HALF_PRECISION = False               # Use FP16 for faster inference (GPU only)
+HALF_PRECISION = False               # Use FP16 for faster inference (opt-in; only applied when CUDA is available)
+                                     # FP16 roughly halves weight memory (YOLOv8 n/s/m: 6.2/23/51.9 MB in FP32)
+TENSORRT_ENABLED = False             # Export/load a TensorRT .engine beside each .pt (CUDA only, first export is slow)
+TENSORRT_INT8 = False                # Build that engine in INT8, calibrated on INT8_CALIBRATION_DATA (~2x FPS, small mAP cost)
+TORCH_COMPILE_ENABLED = False        # torch.compile the network when no TensorRT engine is used
+PINNED_INPUT_ENABLED = True          # Stage frames in pinned memory and copy to GPU on a side CUDA stream
+GPU_DECODE_ENABLED = True            # Decode uploaded JPEGs on the GPU with nvImageCodec when installed (CUDA only)
+CPU_INT8_ENABLED = False             # On CPU-only hosts, export/load an INT8-quantized OpenVINO model
+CPU_INT8_BACKEND = "openvino"        # "openvino" (calibrated static INT8) or "onnxruntime" (dynamic INT8 weights)
+INT8_CALIBRATION_DATA = None         # Dataset YAML used to calibrate INT8 export (None = Ultralytics default)
+INFERENCE_PROCESSES = 0              # >0: run /detect/ inference in N worker processes (CPU hosts; each loads its own model)
+MAX_CONCURRENT_INFERENCES = 2        # Unbatched /detect/ inferences in flight; the rest wait without queueing work
+DYNAMIC_BATCHING_ENABLED = True      # Group concurrent /detect/ requests into one forward pass
+BATCH_MAX = 8                        # Maximum images per batched forward pass
+BATCH_MAX_WAIT_MS = 5                # How long the first request in a batch waits for others
+WARM_LIBRARY_ENABLED = False         # Keep every discovered model loaded so switching is instant (loads all at startup)
+WARM_LIBRARY_MAX_MB = 350            # Skip warm-loading if the model files exceed this combined size
 
 # Cache Settings
 CACHE_ENABLED = False
 CACHE_TTL_SECONDS = 300              # Time-to-live for cached results
+
+
+# ============================================================================
+# Typed Configuration Snapshot
+# ============================================================================
+
+@dataclass(frozen=True)
+class Config:
+    """Immutable, typed view of the settings above"""
+    models_folder: str
+    default_model: Optional[str]
+    compliant_clothes: frozenset
+    non_compliant_clothes: frozenset
+    compliance_rules: Mapping
+    max_file_size_mb: int
+    allowed_image_extensions: frozenset
+    max_image_dimension: int
+    min_image_dimension: int
+    default_confidence_threshold: float
+    yolo_image_size: int
+    enable_gpu: bool
+    half_precision: bool
+    cache_enabled: bool
+    cache_ttl_seconds: int
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Get the shared Config instance (built once)"""
+    return Config(
+        models_folder=MODELS_FOLDER,
+        default_model=DEFAULT_MODEL,
+        compliant_clothes=COMPLIANT_CLOTHES,
+        non_compliant_clothes=NON_COMPLIANT_CLOTHES,
+        compliance_rules=COMPLIANCE_RULES,
+        max_file_size_mb=MAX_FILE_SIZE_MB,
+        allowed_image_extensions=ALLOWED_IMAGE_EXTENSIONS,
+        max_image_dimension=MAX_IMAGE_DIMENSION,
+        min_image_dimension=MIN_IMAGE_DIMENSION,
+        default_confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD,
+        yolo_image_size=YOLO_IMAGE_SIZE,
+        enable_gpu=ENABLE_GPU,
+        half_precision=HALF_PRECISION,
+        cache_enabled=CACHE_ENABLED,
+        cache_ttl_seconds=CACHE_TTL_SECONDS,
+    )
@@ -2,46 +2,130 @@ from ultralytics import YOLO
 import cv2
 import numpy as np
 import torch
-from config import DEFAULT_MODEL, MODELS_FOLDER, ENABLE_GPU, HALF_PRECISION
+from config import (get_config, WARM_LIBRARY_ENABLED, WARM_LIBRARY_MAX_MB, YOLO_IMAGE_SIZE,
+                    TENSORRT_ENABLED, TENSORRT_INT8, TORCH_COMPILE_ENABLED, PINNED_INPUT_ENABLED,
+                    CPU_INT8_ENABLED, CPU_INT8_BACKEND, INT8_CALIBRATION_DATA,
+                    BATCH_MAX, WEBCAM_BATCH_SIZE)
 from utils.model_discovery import get_model_discovery
 import logging
 import os
+import sys
+import threading
+import yaml
 
 logger = logging.getLogger(__name__)
 
+# Optional: Tensorizer streams weights straight into GPU memory
+try:
+    from tensorizer import TensorDeserializer, TensorSerializer
+    TENSORIZER_AVAILABLE = True
+except ImportError:
+    TENSORIZER_AVAILABLE = False
+
+TENSORS_SUFFIX = ".tensors"
+TENSORS_CFG_SUFFIX = ".tensors.yaml"
+
+
+def serialize_model(pt_path: str) -> str:
+    """
+    Convert a YOLO .pt file into a Tensorizer sidecar for fast loading
+    
+    Writes <name>.tensors (weights) and <name>.tensors.yaml (architecture and
+    class names) next to the .pt file. DressDetector picks these up automatically.
+    
+    Args:
+        pt_path: Path to the .pt model file
+        
+    Returns:
+        str: Path to the written .tensors file
+    """
+    if not TENSORIZER_AVAILABLE:
+        raise RuntimeError("Tensorizer not installed. Run: pip install tensorizer")
+    
+    model = YOLO(pt_path)
+    stem = os.path.splitext(pt_path)[0]
+    
+    cfg = dict(model.model.yaml)
+    cfg["names"] = dict(model.names)
+    with open(stem + TENSORS_CFG_SUFFIX, "w") as f:
+        yaml.safe_dump(cfg, f)
+    
+    serializer = TensorSerializer(stem + TENSORS_SUFFIX)
+    serializer.write_module(model.model)
+    serializer.close()
+    
+    logger.info(f"Serialized {pt_path} to {stem + TENSORS_SUFFIX}")
+    return stem + TENSORS_SUFFIX
+
+
 class DressDetector:
     def __init__(self):
         """Initialize the DressDetector with the default model"""
-        self.model_discovery = get_model_discovery(MODELS_FOLDER)
+        self.config = get_config()
+        self.model_discovery = get_model_discovery(self.config.models_folder)
         self.current_model = None
         self.model = None
         self.clothing_classes = {}
+        self._models = {}  # Warm library: {model_name: YOLO} kept resident
+        self._names = {}  # Class names of the current model {class_id: name}
+        self._names_lower_set = frozenset()  # Lowercased class names of the current model
         
         # Determine device (GPU or CPU)
         self.device = self._get_device()
-        logger.info(f"Using device: {self.device}")
+        self.half = self.config.half_precision and self.device == 'cuda'
+        logger.info(f"Using device: {self.device}" + (" (FP16)" if self.half else ""))
+        
+        # Double-buffered pinned staging + a copy stream, so the H2D copy of
+        # frame N+1 overlaps inference of frame N (CUDA only)
+        self._pinned = None
+        self._stream = None
+        self._copy_done = [None, None]  # CUDA event per staging slot
+        self._slot = 0
+        self._pinned_lock = threading.Lock()  # Guards slot selection and staging writes
+        self._infer_lock = threading.Lock()  # The Ultralytics predictor is not re-entrant
+        if PINNED_INPUT_ENABLED and self.device == 'cuda':
+            self._pinned = [
+                torch.empty((YOLO_IMAGE_SIZE, YOLO_IMAGE_SIZE, 3), dtype=torch.uint8).pin_memory()
+                for _ in range(2)
+            ]
+            self._stream = torch.cuda.Stream()
         
         # Discover available models
         available_models = self.model_discovery.get_all_models()
         logger.info(f"Discovered {len(available_models)} models: {list(available_models.keys())}")
         
         if not available_models:
-            raise RuntimeError(f"No models found in {MODELS_FOLDER}")
+            raise RuntimeError(f"No models found in {self.config.models_folder}")
+        
+        # Pre-load every model so switch_model is just a reference swap
+        if WARM_LIBRARY_ENABLED:
+            self._warm_library(available_models)
         
         # Determine which model to load
-        model_to_load = DEFAULT_MODEL if DEFAULT_MODEL else list(available_models.keys())[0]
+        default_model = self.config.default_model
+        model_to_load = default_model if default_model else list(available_models.keys())[0]
         
         # Load the selected model
         if not self._load_model(model_to_load):
             # Try to load the first available model if selected model fails
-            if DEFAULT_MODEL and available_models:
+            if default_model and available_models:
                 first_model = list(available_models.keys())[0]
-                logger.warning(f"Default model '{DEFAULT_MODEL}' not found, using '{first_model}'")
+                logger.warning(f"Default model '{default_model}' not found, using '{first_model}'")
                 if not self._load_model(first_model):
                     raise RuntimeError(f"Failed to initialize detector")
             else:
                 raise RuntimeError(f"Failed to initialize detector")
     
+    @property
+    def class_names(self) -> dict:
+        """Class names of the current model {class_id: name}; treat as read-only"""
+        return self._names
+    
+    @property
+    def class_names_lower(self) -> frozenset:
+        """Lowercased class names of the current model"""
+        return self._names_lower_set
+    
     def _get_device(self):
         """
         Determine the device to use for inference
@@ -49,12 +133,12 @@ class DressDetector:
         Returns:
             str: 'cuda' for GPU or 'cpu' for CPU
         """
-        if ENABLE_GPU and torch.cuda.is_available():
+        if self.config.enable_gpu and torch.cuda.is_available():
             gpu_name = torch.cuda.get_device_name(0)
             logger.info(f"GPU available: {gpu_name}")
             return 'cuda'
         else:
-            if ENABLE_GPU:
+            if self.config.enable_gpu:
                 logger.warning("GPU requested but CUDA not available, using CPU")
             else:
                 logger.info("GPU disabled in config, using CPU")
@@ -73,25 +157,26 @@ class DressDetector:
         model_info = self.model_discovery.get_model_info(model_name)
         
         if not model_info:
-            logger.error(f"Model '{model_name}' not found in {MODELS_FOLDER}")
+            logger.error(f"Model '{model_name}' not found in {self.config.models_folder}")
             return False
         
         model_path = model_info["path"]
         
         try:
-            logger.info(f"Loading model: {model_name} from {model_path}")
-            self.model = YOLO(model_path)
-            
-            # Move model to appropriate device
-            self.model.to(self.device)
-            
-            # Enable half precision if configured and on GPU
-            if HALF_PRECISION and self.device == 'cuda':
-                logger.info("Enabling half precision (FP16) for faster inference")
-                self.model.half()
+            if model_name in self._models:
+                logger.info(f"Using warm model: {model_name}")
+                self.model = self._models[model_name]
+            else:
+                logger.info(f"Loading model: {model_name} from {model_path}")
+                self.model = self._build_model(model_path)
             
             self.current_model = model_name
             
+            # Snapshot per-class lookups so detect() avoids attribute chains per box
+            self._names = self.model.names
+            # Interned so membership tests against the compliance sets compare by identity first
+            self._names_lower_set = frozenset(sys.intern(name.lower()) for name in self._names.values())
+            
             # Cache the clothing classes for this model
             self.clothing_classes[model_name] = self._get_clothing_classes()
             
@@ -102,6 +187,195 @@ class DressDetector:
             logger.error(f"Error loading model {model_name}: {e}", exc_info=True)
             return False
     
+    def _build_model(self, model_path: str) -> YOLO:
+        """
+        Load a YOLO model from disk and prepare it on the inference device
+        
+        Args:
+            model_path: Path to the .pt model file
+            
+        Returns:
+            YOLO: Model ready for inference
+        """
+        # Prefer a TensorRT engine specialized for YOLO_IMAGE_SIZE when enabled
+        if TENSORRT_ENABLED and self.device == 'cuda':
+            engine = self._load_engine(model_path)
+            if engine is not None:
+                return engine
+        
+        # On CPU-only hosts an INT8 model is 2-4x faster and ~4x smaller
+        if CPU_INT8_ENABLED and self.device == 'cpu':
+            int8_model = self._load_int8(model_path)
+            if int8_model is not None:
+                return int8_model
+        
+        stem = os.path.splitext(model_path)[0]
+        if TENSORIZER_AVAILABLE and os.path.exists(stem + TENSORS_SUFFIX):
+            model = self._load_tensorized(stem)
+        else:
+            model = YOLO(model_path)
+        
+        # Move model to appropriate device
+        model.to(self.device)
+        
+        # Enable half precision if configured and on GPU
+        if self.half:
+            logger.info("Enabling half precision (FP16) for faster inference")
+            model.model.half()
+        
+        if TORCH_COMPILE_ENABLED:
+            try:
+                model.model = torch.compile(model.model, mode="reduce-overhead", dynamic=False)
+                logger.info("Compiled model with torch.compile")
+            except Exception as e:
+                logger.warning(f"torch.compile failed, using eager model: {e}")
+        
+        return model
+    
+    def _load_engine(self, model_path: str):
+        """
+        Load the TensorRT engine for a model, exporting it on first use
+        
+        The .engine file is cached next to the .pt so the export only happens once.
+        It is built with a dynamic batch axis (up to the largest batch the
+        batcher or webcam loop sends) and, with TENSORRT_INT8, in INT8.
+        
+        Args:
+            model_path: Path to the .pt model file
+            
+        Returns:
+            YOLO: Engine-backed model, or None if export/loading failed
+        """
+        engine_path = os.path.splitext(model_path)[0] + (".int8.engine" if TENSORRT_INT8 else ".engine")
+        try:
+            if not os.path.exists(engine_path):
+                logger.info(f"Exporting TensorRT engine for {model_path} (one-time, may take a few minutes)")
+                export_args = {"format": "engine", "imgsz": YOLO_IMAGE_SIZE, "half": self.half,
+                               "device": 0, "dynamic": True,
+                               "batch": max(BATCH_MAX, WEBCAM_BATCH_SIZE)}
+                if TENSORRT_INT8:
+                    export_args["int8"] = True
+                    if INT8_CALIBRATION_DATA:
+                        export_args["data"] = INT8_CALIBRATION_DATA
+                exported_path = YOLO(model_path).export(**export_args)
+                if exported_path != engine_path:
+                    os.replace(exported_path, engine_path)
+            logger.info(f"Loading TensorRT engine: {engine_path}")
+            return YOLO(engine_path, task="detect")
+        except Exception as e:
+            logger.warning(f"TensorRT engine unavailable for {model_path}, using PyTorch: {e}")
+            return None
+    
+    def _load_int8(self, model_path: str):
+        """
+        Load the INT8-quantized export of a model, exporting it on first use
+        
+        CPU_INT8_BACKEND selects OpenVINO (static, calibrated) or ONNX Runtime
+        (dynamic quantization of Conv/Gemm/MatMul weights).
+        
+        Args:
+            model_path: Path to the .pt model file
+            
+        Returns:
+            YOLO: INT8 model, or None if export/loading failed
+        """
+        if CPU_INT8_BACKEND == "onnxruntime":
+            return self._load_int8_onnx(model_path)
+        
+        int8_path = os.path.splitext(model_path)[0] + "_int8_openvino_model"
+        try:
+            if not os.path.exists(int8_path):
+                logger.info(f"Exporting INT8 model for {model_path} (one-time, runs calibration)")
+                export_args = {"format": "openvino", "int8": True, "imgsz": YOLO_IMAGE_SIZE}
+                if INT8_CALIBRATION_DATA:
+                    export_args["data"] = INT8_CALIBRATION_DATA
+                int8_path = YOLO(model_path).export(**export_args)
+            logger.info(f"Loading INT8 model: {int8_path}")
+            return YOLO(int8_path, task="detect")
+        except Exception as e:
+            logger.warning(f"INT8 model unavailable for {model_path}, using FP32: {e}")
+            return None
+    
+    def _load_int8_onnx(self, model_path: str):
+        """
+        Load a dynamically INT8-quantized ONNX export of a model, creating it on first use
+        
+        Args:
+            model_path: Path to the .pt model file
+            
+        Returns:
+            YOLO: INT8 ONNX model, or None if export/loading failed
+        """
+        int8_path = os.path.splitext(model_path)[0] + ".int8.onnx"
+        try:
+            if not os.path.exists(int8_path):
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+                
+                logger.info(f"Exporting INT8 ONNX model for {model_path} (one-time)")
+                # Dynamic axes so batched detect_batch calls run in one session call
+                onnx_path = YOLO(model_path).export(format="onnx", imgsz=YOLO_IMAGE_SIZE, dynamic=True)
+                quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8,
+                                 op_types_to_quantize=["Conv", "Gemm", "MatMul"])
+            logger.info(f"Loading INT8 ONNX model: {int8_path}")
+            return YOLO(int8_path, task="detect")
+        except Exception as e:
+            logger.warning(f"INT8 ONNX model unavailable for {model_path}, using FP32: {e}")
+            return None
+    
+    def _warm_library(self, available_models: dict):
+        """
+        Load all discovered models up front and keep them resident
+        
+        Skipped when the combined model file size exceeds WARM_LIBRARY_MAX_MB,
+        in which case models are loaded on demand as before.
+        
+        Args:
+            available_models: Discovered models {model_name: info}
+        """
+        total_mb = sum(info.get("size_bytes") or os.path.getsize(info["path"])
+                       for info in available_models.values()) / (1024 * 1024)
+        if total_mb > WARM_LIBRARY_MAX_MB:
+            logger.warning(f"Skipping warm model library: {total_mb:.1f} MB exceeds {WARM_LIBRARY_MAX_MB} MB budget")
+            return
+        
+        for model_name, info in available_models.items():
+            try:
+                self._models[model_name] = self._build_model(info["path"])
+            except Exception as e:
+                logger.error(f"Error warm-loading model {model_name}: {e}")
+        
+        logger.info(f"Warm model library ready: {len(self._models)} models ({total_mb:.1f} MB)")
+    
+    def _load_tensorized(self, stem: str) -> YOLO:
+        """
+        Load a model from its Tensorizer sidecar files
+        
+        Builds the architecture from <stem>.tensors.yaml on the target device and
+        streams the weights directly into it, skipping the pickle/CPU staging of
+        a regular .pt load.
+        
+        Args:
+            stem: Model path without extension
+            
+        Returns:
+            YOLO: Model with weights loaded
+        """
+        cfg_path = stem + TENSORS_CFG_SUFFIX
+        with open(cfg_path, "r") as f:
+            names = yaml.safe_load(f).get("names", {})
+        
+        model = YOLO(cfg_path, task="detect")
+        model.model.to(self.device)
+        
+        deserializer = TensorDeserializer(stem + TENSORS_SUFFIX, device=self.device)
+        deserializer.load_into_module(model.model)
+        deserializer.close()
+        
+        model.model.names = {int(k): v for k, v in names.items()}
+        model.model.eval()
+        logger.info(f"Loaded weights via Tensorizer from {stem + TENSORS_SUFFIX}")
+        return model
+    
     def _get_clothing_classes(self):
         """
         Helper method to get clothing classes from current model
@@ -122,7 +396,7 @@ class DressDetector:
         Switch to specified clothing detection model
         
         Args:
-            model_name: Key from MODELS config dictionary
+            model_name: Model identifier (filename without .pt)
             
         Returns:
             bool: True if switch successful, False otherwise
@@ -163,48 +437,161 @@ class DressDetector:
         
         try:
             # Run inference on the configured device
-            results = self.model(image, conf=confidence_threshold, device=self.device)
+            ratio = 1.0
+            if self._pinned is not None:
+                results, ratio = self._predict_pinned(image, confidence_threshold)
+            else:
+                results = self.model(image, conf=confidence_threshold, half=self.half,
+                                     imgsz=YOLO_IMAGE_SIZE, device=self.device)
             
             if not results or len(results) == 0:
                 logger.debug("No detections found in image")
                 return []
             
-            detections = results[0]
-            clothes = []
+            clothes = self._to_detections(results[0], ratio)
             
-            # Process each detection
-            for box in detections.boxes:
-                try:
-                    cls_id = int(box.cls[0])
-                    class_name = self.model.names[cls_id]
-                    bbox = box.xyxy[0].tolist()
-                    confidence = float(box.conf[0])
-
-                    clothes.append({
-                        "class": class_name,
-                        "bbox": bbox,
-                        "confidence": confidence,
-                        "model": self.current_model
-                    })
-                except Exception as e:
-                    logger.warning(f"Error processing detection box: {e}")
-                    continue
-            
-            logger.info(f"Detected {len(clothes)} items using model '{self.current_model}'")
+            logger.info("Detected %d items using model '%s'", len(clothes), self.current_model)
             return clothes
             
         except Exception as e:
             logger.error(f"Error during detection: {e}", exc_info=True)
             return []
+    
+    def detect_batch(self, images: list, confidence_threshold: float = 0.25):
+        """
+        Detect clothing items in several images with a single forward pass
+        
+        Args:
+            images: List of input images as numpy arrays
+            confidence_threshold: Minimum confidence for detections (default: 0.25)
+            
+        Returns:
+            list: One list of detection dictionaries per input image
+        """
+        if self.model is None:
+            logger.error("No model loaded for detection")
+            return [[] for _ in images]
+        
+        # A lone image gains nothing from batching; use the pinned single-image path
+        if len(images) == 1:
+            return [self.detect(images[0], confidence_threshold)]
+        
+        try:
+            # The webcam stream and /detect/ can both batch from different threads
+            with self._infer_lock:
+                results = self.model(images, conf=confidence_threshold, half=self.half,
+                                     imgsz=YOLO_IMAGE_SIZE, device=self.device)
+            batch = [self._to_detections(result) for result in results]
+            
+            logger.info("Detected %d items in batch of %d using model '%s'",
+                        sum(map(len, batch)), len(images), self.current_model)
+            return batch
+            
+        except Exception as e:
+            logger.error(f"Error during batch detection: {e}", exc_info=True)
+            return [[] for _ in images]
+    
+    def _to_detections(self, result, ratio: float = 1.0) -> list:
+        """
+        Convert one Ultralytics result into detection dictionaries
+        
+        Args:
+            result: Ultralytics Results object for a single image
+            ratio: Letterbox ratio to divide box coordinates by
+            
+        Returns:
+            list: Detection dictionaries with class, class_id, bbox, confidence, and model
+        """
+        # Pull all boxes off the device in one go (one sync instead of one per box)
+        boxes = result.boxes
+        xyxy = boxes.xyxy.cpu().numpy()
+        if ratio != 1.0:
+            xyxy /= ratio
+        conf = boxes.conf.cpu().numpy()
+        cls_ids = boxes.cls.cpu().numpy().astype(int)
+        names = self._names
+        
+        return [
+            {
+                "class": names[cls_id],
+                "class_id": int(cls_id),
+                "bbox": xyxy[i].tolist(),
+                "confidence": float(conf[i]),
+                "model": self.current_model
+            }
+            for i, cls_id in enumerate(cls_ids)
+        ]
 
+    def _predict_pinned(self, image: np.ndarray, confidence_threshold: float):
+        """
+        Run inference through a pinned staging buffer and a side copy stream
+        
+        The frame is letterboxed (top-left aligned) into one of two pinned
+        uint8 buffers and copied to the GPU on the copy stream, so a second
+        caller can stage and upload while the previous frame is still being
+        inferred. Inference waits only for its own copy, then swaps BGR to
+        RGB and normalizes on the GPU.
+        
+        Args:
+            image: BGR image
+            confidence_threshold: Minimum confidence for detections
+            
+        Returns:
+            tuple: (results, ratio) - divide box coordinates by ratio to map
+                   them back onto the input image
+        """
+        size = YOLO_IMAGE_SIZE
+        h, w = image.shape[:2]
+        ratio = size / max(h, w)
+        new_w, new_h = min(size, round(w * ratio)), min(size, round(h * ratio))
+        # Full-width rows are contiguous in the staging buffer, so those frames are
+        # resized straight into pinned memory; others go through a temporary
+        direct = new_w == size and (new_w, new_h) != (w, h)
+        if not direct and (new_w, new_h) != (w, h):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        
+        with self._pinned_lock:
+            slot = self._slot
+            self._slot ^= 1
+            # Don't overwrite the buffer while its previous upload is in flight
+            if self._copy_done[slot] is not None:
+                self._copy_done[slot].synchronize()
+            
+            pinned = self._pinned[slot]
+            staging = pinned.numpy()
+            # Stays BGR here; channels are swapped on the GPU
+            if direct:
+                cv2.resize(image, (new_w, new_h), dst=staging[:new_h], interpolation=cv2.INTER_LINEAR)
+            else:
+                staging[:new_h, :new_w] = image
+            staging[new_h:] = 114
+            staging[:new_h, new_w:] = 114
+            
+            with torch.cuda.stream(self._stream):
+                tensor = pinned.to(self.device, non_blocking=True)
+                copy_done = torch.cuda.Event()
+                copy_done.record(self._stream)
+            self._copy_done[slot] = copy_done
+        
+        with self._infer_lock:
+            compute_stream = torch.cuda.current_stream()
+            compute_stream.wait_event(copy_done)
+            tensor.record_stream(compute_stream)
+            tensor = tensor.permute(2, 0, 1).flip(0).unsqueeze(0).contiguous()  # HWC BGR -> NCHW RGB
+            tensor = (tensor.half() if self.half else tensor.float()).div_(255)
+            results = self.model(tensor, conf=confidence_threshold, half=self.half,
+                                 device=self.device)
+        
+        return results, ratio
+    
     def get_available_models(self):
         """
         Return list of available clothing detection models
         
         Returns:
-            list: List of model keys from MODELS config
+            list: List of discovered model ids
         """
-        return list(MODELS.keys())
+        return list(self.model_discovery.get_all_models().keys())
     
     def get_model_info(self, model_name: str = None):
         """
@@ -214,14 +601,15 @@ class DressDetector:
             model_name: Optional model name. If None, returns current model info
             
         Returns:
-            dict: Model information including name, path, description, and classes
+            dict: Model information including name, path, and classes
         """
         target_model = model_name if model_name else self.current_model
         
-        if target_model not in MODELS:
+        discovered = self.model_discovery.get_model_info(target_model)
+        if not discovered:
             return None
         
-        info = MODELS[target_model].copy()
+        info = dict(discovered)
         info['name'] = target_model
         info['is_current'] = (target_model == self.current_model)
         info['classes'] = list(self.clothing_classes.get(target_model, []))
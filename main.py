@@ -1,26 +1,50 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 import numpy as np
 import cv2
 from detector import DressDetector
-from utils.compliance import is_compliant, ComplianceManager
+from utils.compliance import is_compliant, ComplianceManager, STATUS_CODES
 from utils.logger import setup_logging
 from utils.cache import get_cache
 from utils.model_discovery import get_model_discovery
 from utils.visibility_checker import get_visibility_checker
 from utils.violation_logger import get_violation_logger
 from utils.face_recognition_insightface import detect_and_identify_faces
-from config import (MODELS_FOLDER, WEBCAM_DETECTION_INTERVAL,
-                    WEBCAM_JPEG_QUALITY, WEBCAM_FPS_LIMIT, 
-                    WEBCAM_SKIP_FRAMES)
+from utils.image_io import decode_upload, encode_jpeg, image_dimensions, release_decode_buffer
+from utils.upload import read_upload, BufferPool
+from utils.infer_cache import get_inference_cache, content_key, frame_key
+from utils.phash import dhash, hamming_distance
+from utils.frame_grabber import FrameGrabber, open_camera
+from utils.webcam_controller import WebcamController
+from utils.pipeline import ThreadedIterator
+from utils.dynamic_batcher import DynamicBatcher
+from utils.process_inference import create_inference_pool, detect_in_pool
+from config import (MODELS_FOLDER, DEFAULT_MODEL, WEBCAM_DETECTION_INTERVAL,
+                    WEBCAM_JPEG_QUALITY, WEBCAM_GPU_JPEG, WEBCAM_FPS_LIMIT, 
+                    WEBCAM_SKIP_FRAMES, WEBCAM_SCENE_HASH_THRESHOLD,
+                    WEBCAM_MAX_REUSED_FRAMES, WEBCAM_BATCH_SIZE, CACHE_ENABLED,
+                    DYNAMIC_BATCHING_ENABLED, INFERENCE_PROCESSES, MAX_CONCURRENT_INFERENCES,
+                    MIN_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION, ALLOWED_IMAGE_EXTENSIONS)
 import logging
 from typing import Optional, List
 from datetime import datetime
 import os
 from contextlib import asynccontextmanager
 import asyncio
+import heapq
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+
+# Optional: orjson serializes responses several times faster than the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Setup logging with rotating file handler
 log_level = os.getenv("LOG_LEVEL", "INFO")
@@ -29,14 +53,24 @@ setup_logging(log_level=log_level, log_file=log_file)
 
 logger = logging.getLogger(__name__)
 
+# Thread pools that keep blocking work off the event loop:
+# decoding/compliance scale with CPU cores, inference is serialized on one worker
+DECODE_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="Decode")
+INFERENCE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Inference")
+# Optional worker processes for CPU-bound inference (each owns a detector)
+INFERENCE_POOL = create_inference_pool(INFERENCE_PROCESSES) if INFERENCE_PROCESSES > 0 else None
+# Bounds unbatched inference calls in flight (created on the server's event loop in lifespan)
+inference_slots: Optional[asyncio.Semaphore] = None
+
 # Background task for cache cleanup
 async def cleanup_task():
-    """Periodic cache cleanup task"""
+    """Periodic cache cleanup task (safety net; expired entries are mostly reclaimed on access)"""
     cache = get_cache()
     while True:
-        await asyncio.sleep(300)  # Run every 5 minutes
+        await asyncio.sleep(3600)  # Run every hour
         try:
-            cache.cleanup_expired()
+            # Sweep off the event loop so a large cache can't stall streaming responses
+            await asyncio.get_running_loop().run_in_executor(None, cache.cleanup_expired)
         except Exception as e:
             logger.error(f"Cache cleanup error: {e}")
 
@@ -45,7 +79,11 @@ async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
     # Startup
     logger.info("Starting DressGuard API...")
+    global inference_slots
+    inference_slots = asyncio.Semaphore(max(INFERENCE_PROCESSES, MAX_CONCURRENT_INFERENCES))
     cleanup_task_handle = asyncio.create_task(cleanup_task())
+    if DYNAMIC_BATCHING_ENABLED:
+        detection_batcher.start()
     
     yield
     
@@ -56,25 +94,66 @@ async def lifespan(app: FastAPI):
         await cleanup_task_handle
     except asyncio.CancelledError:
         pass
+    await detection_batcher.stop()
+    DECODE_EXECUTOR.shutdown(wait=False)
+    INFERENCE_EXECUTOR.shutdown(wait=False)
+    if INFERENCE_POOL is not None:
+        INFERENCE_POOL.shutdown(wait=False, cancel_futures=True)
+
+class NumpyORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also accepts numpy scalars/arrays and non-string dict keys"""
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+# Returning an instance directly skips FastAPI's jsonable_encoder pass over the content
+JSON_RESPONSE = NumpyORJSONResponse if ORJSON_AVAILABLE else JSONResponse
 
 app = FastAPI(
     title="DressGuard API",
     description="AI-powered clothing compliance detection system",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=JSON_RESPONSE
 )
 
-# Initialize detector with error handling
-try:
-    detector = DressDetector()
-    logger.info("DressDetector initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize DressDetector: {e}")
-    detector = None
+# Detector is loaded on first use so startup and metadata endpoints stay fast
+_detector: Optional[DressDetector] = None
+_detector_failed = False
+_detector_lock = threading.Lock()
+
+def get_detector() -> Optional[DressDetector]:
+    """
+    Get the shared detector, loading it on first call
+    
+    Returns:
+        DressDetector, or None if initialization failed
+    """
+    global _detector, _detector_failed
+    if _detector is None and not _detector_failed:
+        with _detector_lock:
+            if _detector is None and not _detector_failed:
+                try:
+                    _detector = DressDetector()
+                    logger.info("DressDetector initialized successfully")
+                except Exception as e:
+                    logger.error(f"Failed to initialize DressDetector: {e}")
+                    _detector_failed = True
+    return _detector
+
+# Concurrent /detect/ requests share batched forward passes on the inference thread
+detection_batcher = DynamicBatcher(lambda images: get_detector().detect_batch(images),
+                                   executor=INFERENCE_EXECUTOR)
+
+# Model discovery is shared by every endpoint (the folder is only rescanned when it changes)
+model_discovery = get_model_discovery(MODELS_FOLDER)
 
 # Initialize compliance manager
 compliance_manager = ComplianceManager()
 
+# Detection results cache (only used when CACHE_ENABLED)
+inference_cache = get_inference_cache()
+
 # Initialize violation logger
 violation_logger = get_violation_logger()
 
@@ -88,7 +167,48 @@ app.add_middleware(
 
 # Configuration constants
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+ALLOWED_EXTENSIONS = ALLOWED_IMAGE_EXTENSIONS  # frozenset, matched against os.path.splitext suffixes
+UPLOAD_BUFFER_POOL = BufferPool(MAX_FILE_SIZE, max_buffers=os.cpu_count() or 4)
+
+def _validate_dimensions(w: int, h: int):
+    """Reject images outside the configured size bounds"""
+    if w < MIN_IMAGE_DIMENSION or h < MIN_IMAGE_DIMENSION:
+        raise HTTPException(status_code=400, detail=f"Image too small (minimum {MIN_IMAGE_DIMENSION}x{MIN_IMAGE_DIMENSION} pixels)")
+    if w > MAX_IMAGE_DIMENSION or h > MAX_IMAGE_DIMENSION:
+        raise HTTPException(status_code=400, detail=f"Image too large (maximum {MAX_IMAGE_DIMENSION}x{MAX_IMAGE_DIMENSION} pixels)")
+
+def _decode_validated(content: bytes):
+    """Validate dimensions and decode an upload (blocking; runs in DECODE_EXECUTOR)"""
+    # Validate dimensions from the header before paying for a decode
+    header_dims = image_dimensions(content)
+    if header_dims:
+        _validate_dimensions(*header_dims)
+
+    # Decode image (large JPEGs are decoded at reduced scale)
+    image, w, h, scale = decode_upload(content)
+    if image is None:
+        raise HTTPException(status_code=400, detail="Failed to decode image")
+
+    # Formats without a parsable header are checked after decoding (original size)
+    if not header_dims:
+        _validate_dimensions(w, h)
+    return image, w, h, scale
+
+# Multipart schema for /detect/ (the body is parsed by hand, so FastAPI can't infer it)
+DETECT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+}
 
 @app.get("/")
 async def root():
@@ -109,7 +229,7 @@ async def root():
 @app.get("/health/")
 async def health_check():
     """Health check endpoint for monitoring"""
-    if detector is None:
+    if _detector_failed:
         return JSONResponse(
             status_code=503,
             content={
@@ -119,18 +239,40 @@ async def health_check():
             }
         )
     
-    model_discovery = get_model_discovery(MODELS_FOLDER)
     available_models = model_discovery.get_all_models()
     
     return {
         "status": "healthy",
-        "detector": "initialized",
-        "current_model": detector.current_model,
+        "detector": "initialized" if _detector else "not loaded",
+        "current_model": _detector.current_model if _detector else None,
         "available_models": list(available_models.keys())
     }
 
+# Where face detection runs; filled in by the first /device/ request
+_face_device: Optional[str] = None
+
+def _detect_face_device() -> str:
+    """Describe the face detection device (loads InsightFace if it isn't yet)"""
+    try:
+        from utils.face_recognition_insightface import get_face_app
+    except ImportError:
+        # Fallback to old face_recognition (always CPU)
+        return "CPU (dlib)"
+    
+    if not get_face_app():
+        return "Not initialized"
+    
+    # InsightFace uses ONNX Runtime providers
+    try:
+        import onnxruntime as ort
+        if 'CUDAExecutionProvider' in ort.get_available_providers():
+            return "GPU (CUDA)"
+    except Exception:
+        pass
+    return "CPU"
+
 @app.get("/device/")
-async def get_device_info():
+async def get_device_info(detector: Optional[DressDetector] = Depends(get_detector)):
     """Get information about the device being used for inference (GPU/CPU)"""
     if detector is None:
         return JSONResponse(
@@ -138,32 +280,13 @@ async def get_device_info():
             content={"error": "Detector not initialized"}
         )
     
-    device_info = detector.get_device_info()
+    # Providers can't change at runtime, so the face device is resolved once
+    global _face_device
+    if _face_device is None:
+        _face_device = await run_in_threadpool(_detect_face_device)
     
-    # Add face detection device info
-    try:
-        from utils.face_recognition_insightface import get_face_app
-        face_app = get_face_app()
-        if face_app:
-            # Check if using GPU or CPU
-            face_device = "CPU"
-            try:
-                # InsightFace uses ONNX Runtime providers
-                import onnxruntime as ort
-                providers = ort.get_available_providers()
-                if 'CUDAExecutionProvider' in providers:
-                    face_device = "GPU (CUDA)"
-                elif 'CPUExecutionProvider' in providers:
-                    face_device = "CPU"
-            except:
-                face_device = "CPU"
-            
-            device_info["face_detection_device"] = face_device
-        else:
-            device_info["face_detection_device"] = "Not initialized"
-    except ImportError:
-        # Fallback to old face_recognition (always CPU)
-        device_info["face_detection_device"] = "CPU (dlib)"
+    device_info = detector.get_device_info()
+    device_info["face_detection_device"] = _face_device
     
     return device_info
 
@@ -171,7 +294,6 @@ async def get_device_info():
 async def get_available_models():
     """Get list of available models with their metadata (dynamically discovered)"""
     try:
-        model_discovery = get_model_discovery(MODELS_FOLDER)
         models = model_discovery.get_all_models()
         
         models_info = []
@@ -181,68 +303,83 @@ async def get_available_models():
                 "path": model_data["path"],
                 "classes": model_data["classes"],
                 "class_count": model_data["class_count"],
-                "is_current": model_id == detector.current_model if detector else False
+                "is_current": model_id == _detector.current_model if _detector else False
             })
         
-        return {
+        return JSON_RESPONSE({
             "models": models_info,
-            "current_model": detector.current_model if detector else None,
+            "current_model": _detector.current_model if _detector else None,
             "total": len(models_info)
-        }
+        })
     except Exception as e:
         logger.error(f"Error fetching models: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch models: {str(e)}")
 
-@app.post("/detect/")
-async def detect_dress(file: UploadFile = File(...), model: Optional[str] = None):
+@app.post("/detect/", openapi_extra=DETECT_REQUEST_BODY)
+async def detect_dress(request: Request, model: Optional[str] = None,
+                       detector: Optional[DressDetector] = Depends(get_detector)):
     """Detect clothing items in uploaded image"""
     if detector is None:
         raise HTTPException(status_code=503, detail="Detector not initialized")
     
+    upload = None
     try:
-        # Validate file extension
-        file_ext = file.filename.split('.')[-1].lower()
-        if f".{file_ext}" not in ALLOWED_EXTENSIONS:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
-            )
-        
-        # Read and validate file size
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size: {MAX_FILE_SIZE / (1024*1024)}MB"
-            )
-        
-        # Decode image
-        nparr = np.frombuffer(content, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            raise HTTPException(status_code=400, detail="Failed to decode image")
+        # Stream the multipart body, validating extension, size (413) and signature (415) as it arrives
+        _, upload = await read_upload(request, MAX_FILE_SIZE, ALLOWED_EXTENSIONS, pool=UPLOAD_BUFFER_POOL)
+        content = upload.content
         
-        # Validate image dimensions
-        h, w = image.shape[:2]
-        if w < 50 or h < 50:
-            raise HTTPException(status_code=400, detail="Image too small (minimum 50x50 pixels)")
-        if w > 4096 or h > 4096:
-            raise HTTPException(status_code=400, detail="Image too large (maximum 4096x4096 pixels)")
+        loop = asyncio.get_running_loop()
 
-        # Switch model if specified
-        if model and model != detector.current_model:
-            success = detector.switch_model(model)
-            if not success:
-                logger.warning(f"Failed to switch to model: {model}")
+        # Switch model if specified (matched case-insensitively, like /switch-model/)
+        if model:
+            matched_model_id = model_discovery.resolve_model_id(model)
+            if matched_model_id is None:
+                logger.warning("Failed to switch to model: %s (not found)", model)
+            elif matched_model_id != detector.current_model:
+                success = await loop.run_in_executor(INFERENCE_EXECUTOR, detector.switch_model, matched_model_id)
+                if not success:
+                    logger.warning("Failed to switch to model: %s", matched_model_id)
+        
+        # Serve repeated uploads from the inference cache (keyed on the raw bytes)
+        cache_key = None
+        cached = None
+        if CACHE_ENABLED:
+            cache_key = await upload.run_reader(DECODE_EXECUTOR, content_key, content, detector.current_model)
+            cached = inference_cache.get(cache_key)
+        
+        if cached is not None:
+            detected_clothes, w, h = cached
+        else:
+            # Header check, decode and size validation all run on a decode worker
+            image, w, h, scale = await upload.run_reader(DECODE_EXECUTOR, _decode_validated, content)
 
-        # Perform detection
-        detected_clothes = detector.detect(image)
+            # Perform detection (worker processes, or micro-batched with concurrent requests)
+            # Unbatched paths wait for a slot first, so a client that disconnects while
+            # waiting never reaches the model
+            if DYNAMIC_BATCHING_ENABLED and INFERENCE_POOL is None:
+                detected_clothes = await detection_batcher.submit(image)
+            else:
+                async with inference_slots:
+                    if INFERENCE_POOL is not None:
+                        detected_clothes = await detect_in_pool(INFERENCE_POOL, image, detector.current_model)
+                    else:
+                        detected_clothes = await loop.run_in_executor(INFERENCE_EXECUTOR, detector.detect, image)
+            release_decode_buffer(image)
+            
+            # Map boxes back to original image coordinates
+            if scale != 1:
+                for det in detected_clothes:
+                    det["bbox"] = [v * scale for v in det["bbox"]]
+            
+            if cache_key:
+                inference_cache.set(cache_key, (detected_clothes, w, h))
         
         # Check compliance using the compliance manager
-        compliant, non_compliant_items, compliance_details = compliance_manager.check_compliance(detected_clothes)
+        compliant, non_compliant_items, compliance_details = await loop.run_in_executor(
+            DECODE_EXECUTOR, compliance_manager.check_compliance, detected_clothes, detector.class_names
+        )
         
-        logger.info(f"Detection complete: {len(detected_clothes)} items found, compliant: {compliant}")
+        logger.info("Detection complete: %d items found, compliant: %s", len(detected_clothes), compliant)
 
         return {
             "clothes_detected": detected_clothes,
@@ -260,39 +397,37 @@ async def detect_dress(file: UploadFile = File(...), model: Optional[str] = None
     except Exception as e:
         logger.error(f"Detection error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Detection failed: {str(e)}")
+    finally:
+        # The pooled upload buffer is reused by the next request, once any
+        # decode/hash worker still reading it (e.g. after a cancel) has finished
+        if upload is not None:
+            upload.release()
 
 @app.post("/switch-model/")
-async def switch_model(model_name: str = Body(..., embed=True)):
+async def switch_model(model_name: str = Body(..., embed=True),
+                       detector: Optional[DressDetector] = Depends(get_detector)):
     """Switch to a different detection model (dynamically discovered)"""
     if detector is None:
         raise HTTPException(status_code=503, detail="Detector not initialized")
     
     try:
-        logger.info(f"Received model switch request: '{model_name}'")
-        
-        # Check if model exists using model discovery
-        model_discovery = get_model_discovery(MODELS_FOLDER)
-        available_models = model_discovery.get_all_models()
+        logger.info("Received model switch request: '%s'", model_name)
         
-        # Find model with case-insensitive match
-        matched_model_id = None
-        for model_id in available_models.keys():
-            if model_id.lower() == model_name.lower():
-                matched_model_id = model_id
-                break
+        # Check if model exists using model discovery (case-insensitive match)
+        matched_model_id = model_discovery.resolve_model_id(model_name)
         
         if not matched_model_id:
-            logger.warning(f"Model '{model_name}' not found in available models")
+            logger.warning("Model '%s' not found in available models", model_name)
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid model '{model_name}'. Available models: {', '.join(available_models.keys())}"
+                detail=f"Invalid model '{model_name}'. Available models: {model_discovery.model_names_csv()}"
             )
         
-        logger.info(f"Matched model: '{model_name}' -> '{matched_model_id}'")
+        logger.info("Matched model: '%s' -> '%s'", model_name, matched_model_id)
         success = detector.switch_model(matched_model_id)
         
         if success:
-            logger.info(f"Successfully switched to model: {matched_model_id}")
+            logger.info("Successfully switched to model: %s", matched_model_id)
             return {
                 "success": True,
                 "current_model": detector.current_model,
@@ -314,16 +449,26 @@ async def switch_model(model_name: str = Body(..., embed=True)):
 @app.get("/current-model/")
 async def get_current_model():
     """Get the currently active model"""
-    if detector is None:
+    if _detector_failed:
         raise HTTPException(status_code=503, detail="Detector not initialized")
     
+    # Report the model that will be loaded without loading the detector
+    if _detector is None:
+        model_ids = model_discovery.list_model_ids()
+        default_model = DEFAULT_MODEL if DEFAULT_MODEL in model_ids else (model_ids[0] if model_ids else None)
+        return {
+            "current_model": default_model,
+            "model_info": {},
+            "loaded": False
+        }
+    
     # Get model info from dynamic discovery
-    model_discovery = get_model_discovery(MODELS_FOLDER)
-    model_info = model_discovery.get_model_info(detector.current_model)
+    model_info = model_discovery.get_model_info(_detector.current_model)
     
     return {
-        "current_model": detector.current_model,
-        "model_info": model_info if model_info else {}
+        "current_model": _detector.current_model,
+        "model_info": model_info if model_info else {},
+        "loaded": True
     }
 
 @app.get("/stats/")
@@ -340,8 +485,8 @@ async def get_stats():
             "size_mb": round(cache_size / (1024 * 1024), 2)
         },
         "detector": {
-            "initialized": detector is not None,
-            "current_model": detector.current_model if detector else None,
+            "initialized": _detector is not None,
+            "current_model": _detector.current_model if _detector else None,
             "available_models": len(model_discovery.get_all_models())
         }
     }
@@ -352,6 +497,7 @@ async def clear_cache():
     try:
         cache = get_cache()
         cache.clear()
+        inference_cache.clear()
         logger.info("Cache cleared via API request")
         return {
             "success": True,
@@ -368,23 +514,11 @@ async def clear_cache():
 @app.get("/compliance/config/")
 async def get_compliance_config():
     """Get current compliance configuration filtered by current model's classes"""
-    config = compliance_manager.get_config()
-    
-    # Filter to only include classes from the current model
-    if detector and hasattr(detector.model, 'names'):
-        current_model_classes = set(c.lower() for c in detector.model.names.values())
-        
-        # Filter compliant and non-compliant classes
-        config["compliant_classes"] = [
-            c for c in config["compliant_classes"] 
-            if c in current_model_classes
-        ]
-        config["non_compliant_classes"] = [
-            c for c in config["non_compliant_classes"] 
-            if c in current_model_classes
-        ]
+    # Filtered per model once and cached until the rules change
+    if _detector and hasattr(_detector.model, 'names'):
+        return compliance_manager.get_config_for_model(_detector.current_model, _detector.class_names_lower)
     
-    return config
+    return compliance_manager.get_config()
 
 @app.post("/compliance/config/")
 async def update_compliance_config(
@@ -475,15 +609,12 @@ async def remove_class(class_name: str = Body(..., embed=True)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/compliance/detected-classes/")
-async def get_all_detected_classes():
+async def get_all_detected_classes(detector: Optional[DressDetector] = Depends(get_detector)):
     """Get list of all unique classes across all models or current model"""
     if detector is None:
         raise HTTPException(status_code=503, detail="Detector not initialized")
     
     try:
-        # Get model discovery instance
-        model_discovery = get_model_discovery(MODELS_FOLDER)
-        
         # Get all unique classes across all models
         all_classes = model_discovery.get_all_unique_classes()
         
@@ -492,12 +623,12 @@ async def get_all_detected_classes():
         if hasattr(detector.model, 'names'):
             current_model_classes = list(detector.model.names.values())
         
-        return {
+        return JSON_RESPONSE({
             "classes": sorted(all_classes),  # All unique classes across all models
             "current_model_classes": sorted(current_model_classes),  # Current model only
             "count": len(all_classes),
             "current_model": detector.current_model
-        }
+        })
     except Exception as e:
         logger.error(f"Error getting detected classes: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -587,9 +718,9 @@ async def get_system_status():
     try:
         # Get model info
         model_info = {
-            "name": detector.model_name if hasattr(detector, 'model_name') else "YOLO",
-            "device": "GPU" if detector.device == "cuda" else "CPU",
-            "status": "Active" if detector else "Inactive"
+            "name": _detector.model_name if hasattr(_detector, 'model_name') else "YOLO",
+            "device": "GPU" if _detector and _detector.device == "cuda" else "CPU",
+            "status": "Active" if _detector else "Inactive"
         }
         
         # Get logging stats
@@ -631,7 +762,7 @@ async def get_system_status():
         
         # Get GPU info if available
         gpu_info = None
-        if detector.device == "cuda":
+        if _detector and _detector.device == "cuda":
             try:
                 import torch
                 if torch.cuda.is_available():
@@ -645,7 +776,7 @@ async def get_system_status():
                 pass
         
         # Webcam status
-        webcam_status = "Active" if webcam_active else "Stopped"
+        webcam_status = "Active" if webcam_controller.active else "Stopped"
         
         return {
             "model": model_info,
@@ -666,7 +797,7 @@ async def get_system_status():
             "gpu": gpu_info,
             "webcam": {
                 "status": webcam_status,
-                "selected_index": selected_camera_index if webcam_active else None
+                "selected_index": webcam_controller.camera_index if webcam_controller.active else None
             }
         }
         
@@ -1158,10 +1289,9 @@ async def generate_report(date: str):
 # Webcam Stream Endpoints
 # ============================================================================
 
-# Global variable to control webcam stream
-webcam_active = False
-webcam_cap = None
-selected_camera_index = 0  # Default to camera 0
+# Webcam stream state (selected camera + running stream), shared by the HTTP handlers
+# and the streaming thread; camera 0 by default
+webcam_controller = WebcamController()
 multiple_people_warning_active = False  # Global flag for notification
 multiple_people_warning_timestamp = 0  # When the warning was triggered
 
@@ -1181,24 +1311,30 @@ async def get_webcam_warning():
         "message": "Multiple people detected - Only one person should be in frame" if multiple_people_warning_active else None
     }
 
+def _probe_camera(index: int) -> Optional[dict]:
+    """Open one camera index and describe it, or None if it can't deliver frames"""
+    cap = open_camera(index)
+    try:
+        if not cap.isOpened():
+            return None
+        # Read one frame: some devices (e.g. V4L2 metadata nodes) open but never deliver
+        ret, _ = cap.read()
+        if not ret:
+            return None
+        return {
+            "index": index,
+            "name": f"Camera {index}",
+            "resolution": f"{int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}"
+        }
+    finally:
+        cap.release()
+
 @app.get("/cameras/list/")
 async def list_cameras():
     """List available cameras on the system"""
-    available_cameras = []
-    
-    # Try to detect up to 10 cameras
-    for i in range(10):
-        cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            # Get camera name/info if available
-            ret, frame = cap.read()
-            if ret:
-                available_cameras.append({
-                    "index": i,
-                    "name": f"Camera {i}",
-                    "resolution": f"{int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}"
-                })
-            cap.release()
+    # Try to detect up to 10 cameras; probes run concurrently since each open can take ~0.5s
+    probes = await asyncio.gather(*(run_in_threadpool(_probe_camera, i) for i in range(10)))
+    available_cameras = [camera for camera in probes if camera is not None]
     
     logger.info(f"Found {len(available_cameras)} cameras")
     return {"cameras": available_cameras}
@@ -1206,25 +1342,18 @@ async def list_cameras():
 @app.post("/cameras/select/")
 async def select_camera(camera_index: int = Body(..., embed=True)):
     """Select which camera to use for streaming"""
-    global selected_camera_index, webcam_active, webcam_cap
-    
     # Validate camera index
-    test_cap = cv2.VideoCapture(camera_index)
+    test_cap = open_camera(camera_index)
     if not test_cap.isOpened():
         test_cap.release()
         raise HTTPException(status_code=400, detail=f"Camera {camera_index} not available")
     test_cap.release()
     
-    # Stop current stream if active
-    if webcam_active:
-        webcam_active = False
-        if webcam_cap is not None:
-            webcam_cap.release()
-            webcam_cap = None
-        await asyncio.sleep(0.5)  # Give time for stream to stop
+    # Stop current stream if active (waits for it to release the camera)
+    await webcam_controller.stop()
     
     # Update selected camera
-    selected_camera_index = camera_index
+    webcam_controller.camera_index = camera_index
     logger.info(f"Selected camera index: {camera_index}")
     
     return {
@@ -1233,26 +1362,149 @@ async def select_camera(camera_index: int = Body(..., embed=True)):
         "camera_index": camera_index
     }
 
-def generate_webcam_frames():
-    """Generate MJPEG frames from webcam with YOLO detection and distance checking"""
-    global webcam_cap, webcam_active, selected_camera_index
+# MJPEG part framing, sent as separate chunks so frames are never concatenated/copied
+MJPEG_FRAME_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+MJPEG_FRAME_TRAILER = b'\r\n'
+
+async def generate_webcam_frames(detector: DressDetector):
+    """
+    Async MJPEG stream: each frame is captured/processed in the threadpool and
+    frame pacing uses asyncio.sleep, so the event loop stays free for other requests
+    """
+    frames = _webcam_frame_iter(detector)
+    frame_delay = 1.0 / WEBCAM_FPS_LIMIT if WEBCAM_FPS_LIMIT > 0 else 0.01
+    next_deadline = time.monotonic()
+    
+    try:
+        while True:
+            frame_bytes = await run_in_threadpool(next, frames, None)
+            if frame_bytes is None:
+                break
+            if not frame_bytes:
+                continue
+            yield MJPEG_FRAME_HEADER
+            yield frame_bytes
+            yield MJPEG_FRAME_TRAILER
+            
+            # Frame rate control: sleep only what is left of this frame's slot, so
+            # processing time counts toward the budget; resync after falling behind
+            next_deadline += frame_delay
+            remaining = next_deadline - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            else:
+                next_deadline = time.monotonic()
+    finally:
+        # Runs the generator's cleanup (camera release) off the event loop
+        await run_in_threadpool(frames.close)
+
+def _iter_detected_frames(grabber: FrameGrabber, detector: DressDetector,
+                          batch_size: int = WEBCAM_BATCH_SIZE):
+    """
+    Yield (frame, detections, names) for webcam frames in capture order
     
-    # Initialize webcam with selected camera index
-    webcam_cap = cv2.VideoCapture(selected_camera_index)
+    Up to batch_size frames are read back to back and every frame that needs
+    YOLO is detected in one batched forward pass. Frames whose scene is
+    unchanged (dHash) reuse the previous detections, re-detecting
+    periodically as a safety net, and near-duplicates hit the inference cache.
+    names is the {class_id: name} dict of the model that produced the
+    detections, so consumers can resolve class ids even after a model switch.
     
-    if not webcam_cap.isOpened():
+    Args:
+        grabber: Running frame grabber
+        detector: Detector to run
+        batch_size: Frames per forward pass
+    """
+    last_scene_hash = None  # dHash of the last frame YOLO actually ran on
+    last_scene_model = None  # Model that produced the reused detections
+    reused_frames = 0  # Consecutive frames that reused the last detections
+    results = []
+    results_names = detector.class_names  # Class names of the model behind results
+    
+    while True:
+        frames = []
+        for _ in range(batch_size):
+            ret, frame = grabber.read()
+            if not ret:
+                break
+            frames.append(frame)
+        if not frames:
+            logger.warning("Failed to grab webcam frame")
+            return
+        
+        model = detector.current_model
+        names = detector.class_names
+        detections = [None] * len(frames)
+        source = [-1] * len(frames)  # Frame whose detections each frame uses (-1 = previous batch)
+        cache_keys = [None] * len(frames)
+        pending = []
+        last_source = -1
+        
+        for i, frame in enumerate(frames):
+            scene_hash = dhash(frame) if WEBCAM_SCENE_HASH_THRESHOLD >= 0 else None
+            scene_unchanged = (
+                scene_hash is not None
+                and last_scene_hash is not None
+                and last_scene_model == model
+                and reused_frames < WEBCAM_MAX_REUSED_FRAMES
+                and hamming_distance(scene_hash, last_scene_hash) <= WEBCAM_SCENE_HASH_THRESHOLD
+            )
+            if scene_unchanged:
+                reused_frames += 1
+                source[i] = last_source
+                continue
+            
+            last_scene_hash, last_scene_model, reused_frames = scene_hash, model, 0
+            source[i] = last_source = i
+            if CACHE_ENABLED:
+                # Near-duplicate frames hit the cache
+                cache_keys[i] = frame_key(frame, model)
+                detections[i] = inference_cache.get(cache_keys[i])
+            if detections[i] is None:
+                pending.append(i)
+        
+        if pending:
+            batch = detector.detect_batch([frames[i] for i in pending], confidence_threshold=0.6)
+            for i, frame_detections in zip(pending, batch):
+                detections[i] = frame_detections
+                if cache_keys[i]:
+                    inference_cache.set(cache_keys[i], frame_detections)
+        
+        for frame, src in zip(frames, source):
+            if src < 0:
+                yield frame, results, results_names
+            else:
+                yield frame, detections[src], names
+        if last_source >= 0:
+            results, results_names = detections[last_source], names
+
+def _webcam_frame_iter(detector: DressDetector):
+    """Generate MJPEG frames from webcam with YOLO detection and distance checking"""
+    # Open the selected camera (stops any stream still holding it)
+    session = webcam_controller.start()
+    
+    if session is None:
         logger.error("Could not open webcam")
         yield b''
         return
     
+    webcam_cap = session.cap
+    
     # Set webcam properties for better performance
     webcam_cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
     webcam_cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
     webcam_cap.set(cv2.CAP_PROP_FPS, 30)
     webcam_cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce buffer to minimize lag
     
+    # Capture runs on its own thread so processing always gets the freshest frame;
+    # frames dropped by WEBCAM_SKIP_FRAMES are grabbed but never decoded
+    grabber = FrameGrabber(webcam_cap, skip_frames=WEBCAM_SKIP_FRAMES).start()
+    
+    # Pipeline: capture thread -> detection thread -> annotate/encode (this thread) -> async yield
+    detected_frames = ThreadedIterator(_iter_detected_frames(grabber, detector),
+                                       maxsize=2, name="WebcamDetect")
+    
     logger.info("Webcam stream started")
-    webcam_active = True
     
     # Frame processing control
     frame_count = 0
@@ -1261,44 +1513,30 @@ def generate_webcam_frames():
     face_detection_interval = 7.0  # Run face detection every 5 seconds
     current_status = "LOADING"  # Track current operation status
     last_logged_time = {}  # Track when each person was last logged {name: timestamp}
+    session_expiry_heap = []  # Min-heap of (expire_time, name, logged_time); stale entries are skipped
     session_reset_timeout = 15.0  # Reset session tracking after 15 seconds of inactivity
     multiple_people_warning_time = 0  # Track when multiple people warning was shown
     multiple_people_warning_duration = 3.0  # Show warning for 3 seconds
     
-    # JPEG encoding parameters for better performance
-    encode_params = [
-        cv2.IMWRITE_JPEG_QUALITY, WEBCAM_JPEG_QUALITY,
-        cv2.IMWRITE_JPEG_OPTIMIZE, 1    # Optimize encoding
-    ]
-    
-    # FPS control
-    frame_delay = 1.0 / WEBCAM_FPS_LIMIT if WEBCAM_FPS_LIMIT > 0 else 0.01
-    
     try:
-        while webcam_active:
-            ret, frame = webcam_cap.read()
-            
-            if not ret:
-                logger.warning("Failed to grab webcam frame")
+        for frame, results, class_names in detected_frames:
+            if session.should_stop():
                 break
             
-            # Frame skipping for performance (optional)
-            if WEBCAM_SKIP_FRAMES > 0 and frame_count % (WEBCAM_SKIP_FRAMES + 1) != 0:
-                frame_count += 1
-                continue
-            
             try:
                 frame_count += 1
                 current_time = time.time()
-                annotated_frame = frame.copy()
+                # Annotations are drawn straight onto the captured frame (it is ours
+                # alone for this iteration; anything kept longer must be copied)
+                annotated_frame = frame
                 
                 # Reset session tracking if person hasn't been seen for a while
-                expired_persons = []
-                for person_name, last_time in last_logged_time.items():
-                    if current_time - last_time > session_reset_timeout:
-                        expired_persons.append(person_name)
-                
-                for person_name in expired_persons:
+                # (heap pop instead of scanning last_logged_time every frame)
+                while session_expiry_heap and session_expiry_heap[0][0] < current_time:
+                    _, person_name, logged_time = heapq.heappop(session_expiry_heap)
+                    # Skip entries superseded by a later log or already removed
+                    if last_logged_time.get(person_name) != logged_time:
+                        continue
                     if person_name in logged_persons:
                         logged_persons.remove(person_name)
                         del last_logged_time[person_name]
@@ -1307,9 +1545,7 @@ def generate_webcam_frames():
                 # Set initial status
                 current_status = "DETECTING"
                 
-                # Always run YOLO detection
-                results = detector.detect(frame, confidence_threshold=0.6)
-                is_compliant, non_compliant_items, compliance_details = compliance_manager.check_compliance(results)
+                is_compliant, non_compliant_items, compliance_details = compliance_manager.check_compliance(results, class_names)
                 
                 # Simple face detection every 5 seconds
                 if not is_compliant and violation_logger.is_logging_enabled():
@@ -1318,9 +1554,8 @@ def generate_webcam_frames():
                         current_status = "SCANNING FACE..."
                         last_face_detection_time = current_time
                         
-                        # Convert frame to RGB for face detection
-                        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        face_results = detect_and_identify_faces(frame_rgb)
+                        # InsightFace works in BGR, so the captured frame goes in as-is
+                        face_results = detect_and_identify_faces(frame, bgr=True)
                         
                         # Handle face detection
                         if len(face_results) > 0:
@@ -1352,9 +1587,9 @@ def generate_webcam_frames():
                                     
                                     # If Unknown was logged but now we identified a known person, delete Unknown immediately
                                     # This happens regardless of whether we log the known person or not
-                                    if 'Unknown' in logged_persons or violation_logger._is_person_logged_today('Unknown'):
-                                        logger.info(f"Known person {name} detected - deleting any Unknown logs (session cleanup)")
-                                        violation_logger._delete_previous_log('Unknown')
+                                    unknown_was_logged, _ = violation_logger.check_and_delete('Unknown')
+                                    if unknown_was_logged or 'Unknown' in logged_persons:
+                                        logger.info(f"Known person {name} detected - deleted any Unknown logs (session cleanup)")
                                         if 'Unknown' in logged_persons:
                                             logged_persons.remove('Unknown')
                                         if 'Unknown' in last_logged_time:
@@ -1369,17 +1604,17 @@ def generate_webcam_frames():
                                             should_skip = True
                                             time_until_reset = session_reset_timeout - time_since_logged
                                             current_status = f"{name} - Logged (resets in {int(time_until_reset)}s)"
-                                            logger.debug(f"{name} already logged this session, {int(time_until_reset)}s until reset")
+                                            logger.debug("%s already logged this session, %ds until reset", name, time_until_reset)
                                     
                                     if not should_skip:
                                         # Either first time or session timeout expired - can log/update
                                         
                                         # Check if person was logged earlier today (from database)
-                                        if violation_logger._is_person_logged_today(name):
+                                        # (previous log is deleted in the same step so it can be replaced)
+                                        was_logged_today, _ = violation_logger.check_and_delete(name)
+                                        if was_logged_today:
                                             current_status = f"UPDATING: {name}..."
-                                            logger.info(f"Person {name} already logged today - deleting old log and replacing with new one")
-                                            # Delete previous log before saving new one
-                                            violation_logger._delete_previous_log(name)
+                                            logger.info(f"Person {name} already logged today - deleted old log, replacing with new one")
                                         else:
                                             current_status = f"LOGGING: {name}..."
                                         
@@ -1393,8 +1628,9 @@ def generate_webcam_frames():
                                         logger.info(f"Filtered to known face only: {known_face_only}")
                                         
                                         # Log the violation (will replace if person was logged before)
+                                        # save_violation snapshots the frame itself before going async
                                         save_result = violation_logger.save_violation(
-                                            frame.copy(),
+                                            frame,
                                             results,
                                             known_face_only,  # Pass only the known face, not all faces
                                             {
@@ -1407,6 +1643,8 @@ def generate_webcam_frames():
                                             logger.info(f"✓ Violation logged successfully: {name}, items: {non_compliant_items}")
                                             logged_persons.add(name)
                                             last_logged_time[name] = current_time  # Track when this person was logged
+                                            heapq.heappush(session_expiry_heap,
+                                                           (current_time + session_reset_timeout, name, current_time))
                                             current_status = f"✓ LOGGED: {name}"
                                         else:
                                             logger.warning(f"✗ Violation NOT logged for {name} - save_violation returned False")
@@ -1417,7 +1655,7 @@ def generate_webcam_frames():
                                         current_status = "LOGGING: Unknown..."
                                         logger.info("Unknown person detected - logging violation")
                                         violation_logger.save_violation(
-                                            frame.copy(),
+                                            frame,
                                             results,
                                             face_results,
                                             {
@@ -1427,6 +1665,8 @@ def generate_webcam_frames():
                                         )
                                         logged_persons.add('Unknown')
                                         last_logged_time['Unknown'] = current_time
+                                        heapq.heappush(session_expiry_heap,
+                                                       (current_time + session_reset_timeout, 'Unknown', current_time))
                                         current_status = "✓ LOGGED: Unknown"
                                     else:
                                         # Already logged Unknown in this session
@@ -1448,7 +1688,8 @@ def generate_webcam_frames():
                             current_status = f"Next scan in {int(time_until_next)}s"
                 
                 # Draw bounding boxes
-                annotated_frame = draw_detections_on_frame(annotated_frame, results)
+                annotated_frame = draw_detections_on_frame(annotated_frame, results,
+                                                           class_names=class_names)
                 
                 # Dynamic status indicator with color coding - TOP LEFT with background
                 status_text = current_status
@@ -1472,94 +1713,141 @@ def generate_webcam_frames():
                     status_color = (0, 255, 0)  # Green - default detecting
                 
                 # Draw status with background for better visibility
-                h, w = annotated_frame.shape[:2]
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                font_scale = 0.6
-                thickness = 2
-                (text_width, text_height), baseline = cv2.getTextSize(status_text, font, font_scale, thickness)
-                
-                # Background rectangle - top left
-                padding = 8
-                bg_x1, bg_y1 = 5, 5
-                bg_x2, bg_y2 = text_width + padding * 2, text_height + padding * 2
+                (bg_x2, bg_y2), text_mask = _status_banner(status_text)
                 
-                overlay = annotated_frame.copy()
-                cv2.rectangle(overlay, (bg_x1, bg_y1), (bg_x2, bg_y2), (0, 0, 0), -1)
-                cv2.addWeighted(overlay, 0.7, annotated_frame, 0.3, 0, annotated_frame)
+                # Translucent black banner: blending with black at 0.7 just scales the
+                # banner pixels by 0.3, so only that region is touched
+                roi = annotated_frame[STATUS_BANNER_MARGIN:bg_y2 + 1, STATUS_BANNER_MARGIN:bg_x2 + 1]
+                roi[:] = cv2.convertScaleAbs(roi, alpha=0.3)
                 
-                # Status text
-                cv2.putText(annotated_frame, status_text, (padding, text_height + padding),
-                           font, font_scale, status_color, thickness)
+                # Status text: paint the cached glyph mask instead of rasterizing again
+                mask_h = min(text_mask.shape[0], annotated_frame.shape[0])
+                mask_w = min(text_mask.shape[1], annotated_frame.shape[1])
+                annotated_frame[:mask_h, :mask_w][text_mask[:mask_h, :mask_w]] = status_color
                 
-                # Encode frame as JPEG with optimized parameters
-                ret, buffer = cv2.imencode('.jpg', annotated_frame, encode_params)
+                # Encode frame as JPEG (TurboJPEG SIMD path when available)
+                frame_bytes = encode_jpeg(annotated_frame, WEBCAM_JPEG_QUALITY, gpu=WEBCAM_GPU_JPEG)
                 
-                if not ret:
+                if frame_bytes is None:
                     continue
                 
-                frame_bytes = buffer.tobytes()
-                
-                # Yield frame in MJPEG format
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                
-                # Dynamic frame rate control
-                time.sleep(frame_delay)
-
+                # Yield the encoded JPEG; MJPEG framing is added by generate_webcam_frames
+                yield frame_bytes
                 
             except Exception as e:
                 logger.error(f"Error processing webcam frame: {e}")
                 continue
                 
     finally:
-        if webcam_cap is not None:
-            webcam_cap.release()
-            webcam_cap = None
-        webcam_active = False
+        detected_frames.close()
+        grabber.stop()
+        webcam_controller.finish(session)
         logger.info("Webcam stream stopped")
 
-def draw_detections_on_frame(frame, detections, compliance_info=None):
+# Box colors (BGR) indexed by compliance code + 1: non-compliant, neutral, compliant
+COLOR_LUT = np.array([
+    (0, 0, 255),    # Red for non-compliant
+    (255, 165, 0),  # Orange for neutral/unknown
+    (0, 255, 0),    # Green for compliant
+], dtype=np.uint8)
+
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_FONT_SCALE = 0.6
+LABEL_THICKNESS = 2
+
+# Label text -> ((width, height), baseline); labels repeat across frames
+# (class name plus a 2-decimal confidence), so measure each one only once
+_label_size_cache = {}
+
+def _label_size(label: str):
+    size = _label_size_cache.get(label)
+    if size is None:
+        size = cv2.getTextSize(label, LABEL_FONT, LABEL_FONT_SCALE, LABEL_THICKNESS)
+        _label_size_cache[label] = size
+    return size
+
+STATUS_BANNER_PADDING = 8
+STATUS_BANNER_MARGIN = 5
+STATUS_BANNER_CACHE_SIZE = 16
+
+# Status text -> ((bg_x2, bg_y2), glyph mask); the banner text only changes a
+# few times per second, so glyphs are rasterized once per distinct string
+_status_banner_cache = OrderedDict()
+
+def _status_banner(status_text: str):
+    """
+    Measure and rasterize the webcam status banner text (LRU cached)
+    
+    Args:
+        status_text: Banner text
+        
+    Returns:
+        tuple: ((bg_x2, bg_y2) banner corner, bool glyph mask anchored at the frame origin)
+    """
+    cached = _status_banner_cache.get(status_text)
+    if cached is not None:
+        _status_banner_cache.move_to_end(status_text)
+        return cached
+    
+    (text_width, text_height), baseline = cv2.getTextSize(status_text, LABEL_FONT,
+                                                          LABEL_FONT_SCALE, LABEL_THICKNESS)
+    padding = STATUS_BANNER_PADDING
+    corner = (text_width + padding * 2, text_height + padding * 2)
+    
+    # putText with LINE_8 writes the color verbatim, so a glyph mask reproduces it exactly
+    mask = np.zeros((text_height + padding + baseline + LABEL_THICKNESS + 1,
+                     padding + text_width + LABEL_THICKNESS + 1), dtype=np.uint8)
+    cv2.putText(mask, status_text, (padding, text_height + padding),
+                LABEL_FONT, LABEL_FONT_SCALE, 255, LABEL_THICKNESS)
+    
+    cached = (corner, mask.astype(bool))
+    _status_banner_cache[status_text] = cached
+    if len(_status_banner_cache) > STATUS_BANNER_CACHE_SIZE:
+        _status_banner_cache.popitem(last=False)
+    return cached
+
+def draw_detections_on_frame(frame, detections, compliance_info=None, class_names=None):
     """Draw bounding boxes and labels on frame with compliance color coding
     
     Note: compliance_info parameter is kept for compatibility but not used for banner.
     Color coding is determined by checking compliance_manager directly.
+    
+    When class_names (the {class_id: name} of the model that produced the
+    detections) is given, colors come from one gather over the manager's
+    per-class status table instead of a per-detection lookup; detections
+    whose ids don't match class_names fall back to classifying by name.
+    
+    The frame is drawn on in place and returned; pass a copy if the
+    original pixels are still needed.
     """
-    annotated_frame = frame.copy()
+    annotated_frame = frame
+    if not detections:
+        return annotated_frame
     
-    # Determine which classes are compliant/non-compliant for color coding
-    compliant_classes = compliance_manager.compliant_classes
-    non_compliant_classes = compliance_manager.non_compliant_classes
+    codes = None
+    if class_names is not None:
+        # None when the detections came from another model (e.g. right after a switch)
+        codes = compliance_manager.status_codes(detections, class_names)
+    if codes is None:
+        classify = compliance_manager.classify
+        codes = np.array([STATUS_CODES[classify(det['class'])] for det in detections], dtype=np.int8)
+    colors = COLOR_LUT[codes + 1].tolist()
     
-    for det in detections:
+    for det, color in zip(detections, colors):
         class_name = det['class']
-        class_name_lower = class_name.lower().strip()
         confidence = det['confidence']
         bbox = det['bbox']
         
         x1, y1, x2, y2 = map(int, bbox)
         
-        # Determine color based on compliance status
-        if class_name_lower in non_compliant_classes:
-            color = (0, 0, 255)  # Red for non-compliant (BGR format)
-            status = "NON-COMPLIANT"
-        elif class_name_lower in compliant_classes:
-            color = (0, 255, 0)  # Green for compliant
-            status = "COMPLIANT"
-        else:
-            color = (255, 165, 0)  # Orange for neutral/unknown
-            status = "NEUTRAL"
-        
         # Draw rectangle
         cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
         
         # Draw label with background
         label = f"{class_name}: {confidence:.2f}"
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.6
-        thickness = 2
         
         # Get text size for background
-        (text_width, text_height), baseline = cv2.getTextSize(label, font, font_scale, thickness)
+        (text_width, text_height), baseline = _label_size(label)
         
         # Draw background rectangle
         cv2.rectangle(annotated_frame, 
@@ -1569,40 +1857,41 @@ def draw_detections_on_frame(frame, detections, compliance_info=None):
         
         # Draw text
         cv2.putText(annotated_frame, label, (x1, y1 - 5), 
-                   font, font_scale, (255, 255, 255), thickness)
+                   LABEL_FONT, LABEL_FONT_SCALE, (255, 255, 255), LABEL_THICKNESS)
     
     return annotated_frame
 
 @app.get("/webcam/stream/")
-async def webcam_stream():
+async def webcam_stream(detector: Optional[DressDetector] = Depends(get_detector)):
     """Stream webcam feed with real-time YOLO detection (MJPEG format)"""
     if detector is None:
         raise HTTPException(status_code=503, detail="Detector not initialized")
     
     return StreamingResponse(
-        generate_webcam_frames(),
+        generate_webcam_frames(detector),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
 @app.post("/webcam/stop/")
 async def stop_webcam():
     """Stop the webcam stream"""
-    global webcam_active, webcam_cap
-    
     logger.info("Stop webcam request received")
-    webcam_active = False
     
-    # Give time for the stream to stop
-    await asyncio.sleep(0.5)
+    # The stream releases the camera itself; wait until it has
+    if await webcam_controller.stop():
+        logger.info("Webcam released successfully")
     
-    # Release the camera if it's still open
-    if webcam_cap is not None:
-        try:
-            webcam_cap.release()
-            logger.info("Webcam released successfully")
-        except Exception as e:
-            logger.error(f"Error releasing webcam: {e}")
-        finally:
-            webcam_cap = None
+    return {"success": True, "message": "Webcam stream stopped"}
+
+if __name__ == "__main__":
+    import uvicorn
     
-    return {"success": True, "message": "Webcam stream stopped"}
\ No newline at end of file
+    # uvloop (Linux/macOS, optional) replaces asyncio's selector loop with libuv:
+    # cheaper wakeups and socket writes for the MJPEG stream and concurrent /detect/ calls
+    try:
+        import uvloop  # noqa: F401
+        loop_impl = "uvloop"
+    except ImportError:
+        loop_impl = "asyncio"
+    logger.info(f"Starting server with {loop_impl} event loop")
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop_impl)
@@ -5,9 +5,10 @@ Uses InsightFace (MobileFaceNet) for faster face encoding
 
 import os
 import redis
-import pickle
 import cv2
+import numpy as np
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 logging.basicConfig(level=logging.INFO)
@@ -15,38 +16,129 @@ logger = logging.getLogger(__name__)
 
 try:
     from insightface.app import FaceAnalysis
+    from insightface.utils import face_align
     INSIGHTFACE_AVAILABLE = True
 except ImportError:
     INSIGHTFACE_AVAILABLE = False
     logger.error("InsightFace not installed. Run: pip install insightface onnxruntime")
     exit(1)
 
+# onnxruntime ships with InsightFace; needed here only to tune its sessions
+try:
+    import onnxruntime
+    import insightface.model_zoo.model_zoo as insightface_model_zoo
+    ONNXRUNTIME_AVAILABLE = hasattr(insightface_model_zoo, "PickableInferenceSession")
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
 # Redis connection
 r = redis.Redis(host='localhost', port=6379, db=0)
 KNOWN_USERS_SET = "known_users"
+EMBED_BATCH_SIZE = 32  # Aligned face crops per batched recognition call
+IMREAD_THREADS = 4  # Images decoded ahead of detection per worker
+# Optimized ONNX graphs, kept out of InsightFace's model directory (FaceAnalysis loads every *.onnx there)
+ORT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ort_cache", "buffalo_s")
 
-# Initialize InsightFace
-logger.info("Initializing InsightFace...")
-app = FaceAnalysis(
-    name='buffalo_s',  # Lightweight model
-    providers=['CPUExecutionProvider']  # Use CPU only for sync
-)
-app.prepare(ctx_id=-1, det_size=(640, 640))  # ctx_id=-1 for CPU
-logger.info("InsightFace initialized successfully (CPU mode)")
+# InsightFace models, loaded once per process (lazily, so pool workers each own theirs)
+app = None
+det_model = None
+rec_model = None
 
-def register_or_update_person(person_name: str, images_folder: str):
+if ONNXRUNTIME_AVAILABLE:
+    class TunedInferenceSession(insightface_model_zoo.PickableInferenceSession):
+        """
+        InsightFace session that is created with tuned ONNX Runtime options
+        
+        The first run applies all graph optimizations and saves the result to
+        ORT_CACHE_DIR; later runs load that graph with optimizations disabled,
+        so the passes run only once. Threads are capped so pool workers don't
+        oversubscribe cores.
+        """
+        
+        intra_op_threads = 0  # Set per process by init_insightface
+        
+        def __init__(self, model_path, **kwargs):
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.intra_op_threads
+            options.enable_cpu_mem_arena = True
+            
+            name = os.path.splitext(os.path.basename(model_path))[0]
+            optimized_path = os.path.join(ORT_CACHE_DIR, f"{name}.opt.onnx")
+            # Workers start together, so each writes its own file and renames it into place
+            temp_path = None
+            load_path = model_path
+            if os.path.exists(optimized_path):
+                load_path = optimized_path
+                options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+            else:
+                options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+                temp_path = f"{optimized_path}.{os.getpid()}.tmp"
+                options.optimized_model_filepath = temp_path
+            
+            try:
+                super().__init__(load_path, sess_options=options, **kwargs)
+            except Exception as e:
+                logger.warning(f"Using default ONNX Runtime session for {model_path}: {e}")
+                super().__init__(model_path, **kwargs)
+                temp_path = None
+            # Pickling reloads from model_path, which comes back through this class
+            self.model_path = model_path
+            if temp_path is not None and os.path.exists(temp_path):
+                os.replace(temp_path, optimized_path)
+
+def init_insightface(intra_op_threads: int = 0):
     """
-    Register or update a person's face encodings in Redis
+    Load the InsightFace detection + recognition models for this process
+    
+    Args:
+        intra_op_threads: ONNX Runtime threads per session (0 = all cores)
+    """
+    global app, det_model, rec_model
+    if app is not None:
+        return
+    
+    logger.info("Initializing InsightFace...")
+    # FaceAnalysis builds its sessions through PickableInferenceSession; swap in the
+    # tuned class only while this process's models are created
+    default_session_class = None
+    if ONNXRUNTIME_AVAILABLE:
+        os.makedirs(ORT_CACHE_DIR, exist_ok=True)
+        TunedInferenceSession.intra_op_threads = intra_op_threads or (os.cpu_count() or 1)
+        default_session_class = insightface_model_zoo.PickableInferenceSession
+        insightface_model_zoo.PickableInferenceSession = TunedInferenceSession
+    try:
+        app = FaceAnalysis(
+            name='buffalo_s',  # Lightweight model
+            allowed_modules=['detection', 'recognition'],  # Sync only needs boxes and embeddings
+            providers=['CPUExecutionProvider']  # Use CPU only for sync
+        )
+    finally:
+        if default_session_class is not None:
+            insightface_model_zoo.PickableInferenceSession = default_session_class
+    app.prepare(ctx_id=-1, det_size=(640, 640))  # ctx_id=-1 for CPU
+    det_model = app.det_model
+    rec_model = app.models['recognition']
+    logger.info("InsightFace initialized successfully (CPU mode)")
+
+def _read_image(image_path: str):
+    """Read an image for the decode pool; errors are returned so one bad file doesn't stop the folder"""
+    try:
+        return cv2.imread(image_path)
+    except Exception as e:
+        return e
+
+def encode_person(person_name: str, images_folder: str):
+    """
+    Compute a person's face embeddings without touching Redis (safe in a worker process)
     
     Args:
         person_name: Name of the person
         images_folder: Path to folder containing person's images
+        
+    Returns:
+        tuple: (person_name, (N, D) float32 embedding matrix or None)
     """
-    user_id = person_name.lower().replace(" ", "_")
-    encoding_list_key = f"user:{user_id}:encodings"
-    
-    # Clear existing encodings
-    r.delete(encoding_list_key)
+    init_insightface()
     
     # Process all images in folder
     image_files = [f for f in os.listdir(images_folder) 
@@ -54,56 +146,102 @@ def register_or_update_person(person_name: str, images_folder: str):
     
     if not image_files:
         logger.warning(f"No images found for {person_name}")
-        return 0
+        return person_name, None
     
-    encodings_count = 0
+    # Aligned crops of each image's main face; recognition runs on them in batches below
+    crops = []
+    crop_files = []
     
-    for image_file in image_files:
-        image_path = os.path.join(images_folder, image_file)
-        
+    # Decode ahead on a few threads (cv2.imread releases the GIL) while detection runs
+    image_paths = [os.path.join(images_folder, image_file) for image_file in image_files]
+    with ThreadPoolExecutor(max_workers=IMREAD_THREADS) as decode_pool:
+        for image_file, image_path, image in zip(image_files, image_paths,
+                                                 decode_pool.map(_read_image, image_paths)):
+            try:
+                if isinstance(image, Exception):
+                    raise image
+                
+                if image is None:
+                    logger.warning(f"Could not read image: {image_path}")
+                    continue
+                
+                # Detect faces (detector only; app.get would also run every other model per face)
+                bboxes, kpss = det_model.detect(image, max_num=0, metric='default')
+                
+                if len(bboxes) == 0:
+                    logger.warning(f"No face found in {image_file}")
+                    continue
+                
+                if len(bboxes) > 1:
+                    logger.warning(f"Multiple faces found in {image_file}, using largest")
+                
+                # Use the largest face (most likely the main subject)
+                areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+                largest = int(np.argmax(areas))
+                
+                # Same alignment app.get uses before computing the embedding
+                crops.append(face_align.norm_crop(image, landmark=kpss[largest],
+                                                  image_size=rec_model.input_size[0]))
+                crop_files.append(image_file)
+                
+            except Exception as e:
+                logger.error(f"Error processing {image_file}: {e}")
+    
+    # Face embeddings (stored together below), one recognition forward pass per batch
+    embeddings = []
+    for start in range(0, len(crops), EMBED_BATCH_SIZE):
+        batch = crops[start:start + EMBED_BATCH_SIZE]
         try:
-            # Read image
-            image = cv2.imread(image_path)
-            
-            if image is None:
-                logger.warning(f"Could not read image: {image_path}")
-                continue
-            
-            # Detect faces
-            faces = app.get(image)
-            
-            if len(faces) == 0:
-                logger.warning(f"No face found in {image_file}")
-                continue
-            
-            if len(faces) > 1:
-                logger.warning(f"Multiple faces found in {image_file}, using largest")
-            
-            # Use the largest face (most likely the main subject)
-            face = max(faces, key=lambda f: (f.bbox[2] - f.bbox[0]) * (f.bbox[3] - f.bbox[1]))
-            
-            # Get face embedding
-            embedding = face.embedding
-            
-            # Store in Redis
-            encoding_bytes = pickle.dumps(embedding)
-            r.rpush(encoding_list_key, encoding_bytes)
-            encodings_count += 1
-            
-            logger.info(f"  ✓ Processed {image_file}")
-            
+            embeddings.extend(rec_model.get_feat(batch).astype(np.float32))
+            for image_file in crop_files[start:start + EMBED_BATCH_SIZE]:
+                logger.info(f"  ✓ Processed {image_file}")
         except Exception as e:
-            logger.error(f"Error processing {image_file}: {e}")
+            logger.error(f"Error computing embeddings for {person_name}: {e}")
+    
+    return person_name, (np.stack(embeddings) if embeddings else None)
+
+def store_person(person_name: str, matrix):
+    """
+    Replace a person's stored embeddings in Redis
+    
+    Args:
+        person_name: Name of the person
+        matrix: Embedding matrix from encode_person (None = no valid faces)
+        
+    Returns:
+        int: Number of encodings stored
+    """
+    user_id = person_name.lower().replace(" ", "_")
+    encodings_count = 0 if matrix is None else len(matrix)
+    
+    # Replace the stored embeddings in one round trip: a single (N, D) float32
+    # matrix plus its shape, instead of one pickled RPUSH per image
+    with r.pipeline() as pipe:
+        pipe.delete(f"user:{user_id}:encodings", f"user:{user_id}:emb", f"user:{user_id}:shape")
+        if encodings_count > 0:
+            pipe.set(f"user:{user_id}:emb", matrix.tobytes())
+            pipe.set(f"user:{user_id}:shape", f"{matrix.shape[0]}x{matrix.shape[1]}")
+            # Add user to known users set
+            pipe.sadd(KNOWN_USERS_SET, user_id)
+        pipe.execute()
     
     if encodings_count > 0:
-        # Add user to known users set
-        r.sadd(KNOWN_USERS_SET, user_id)
         logger.info(f"✓ Registered {person_name} with {encodings_count} encodings")
     else:
         logger.warning(f"✗ Failed to register {person_name} - no valid encodings")
     
     return encodings_count
 
+def register_or_update_person(person_name: str, images_folder: str):
+    """
+    Register or update a person's face encodings in Redis
+    
+    Args:
+        person_name: Name of the person
+        images_folder: Path to folder containing person's images
+    """
+    return store_person(*encode_person(person_name, images_folder))
+
 def get_all_registered_users():
     """Get list of all registered users from Redis"""
     user_ids = [uid.decode('utf-8') for uid in r.smembers(KNOWN_USERS_SET)]
@@ -112,9 +250,8 @@ def get_all_registered_users():
 def clear_user_from_db(person_name: str):
     """Remove a user from the database"""
     user_id = person_name.lower().replace(" ", "_")
-    encoding_list_key = f"user:{user_id}:encodings"
     
-    r.delete(encoding_list_key)
+    r.delete(f"user:{user_id}:encodings", f"user:{user_id}:emb", f"user:{user_id}:shape")
     r.srem(KNOWN_USERS_SET, user_id)
     logger.info(f"Removed {person_name} from database")
 
@@ -146,18 +283,25 @@ def main():
     total_encodings = 0
     successful_persons = 0
     
-    for person_folder in person_folders:
-        person_name = person_folder.replace("_", " ")
-        folder_path = os.path.join(database_folder, person_folder)
-        
-        logger.info(f"Processing: {person_name}")
-        count = register_or_update_person(person_name, folder_path)
-        
-        if count > 0:
-            successful_persons += 1
-            total_encodings += count
-        
-        logger.info("")
+    person_names = [person_folder.replace("_", " ") for person_folder in person_folders]
+    folder_paths = [os.path.join(database_folder, person_folder) for person_folder in person_folders]
+    
+    # Folders are encoded in parallel worker processes, each holding its own models;
+    # Redis writes stay here, one pipeline per person
+    workers = max(1, (os.cpu_count() or 2) - 1)
+    # Split the cores between workers so their ONNX Runtime thread pools don't oversubscribe
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_insightface,
+                             initargs=(threads_per_worker,)) as executor:
+        for person_name, matrix in executor.map(encode_person, person_names, folder_paths):
+            logger.info(f"Processing: {person_name}")
+            count = store_person(person_name, matrix)
+            
+            if count > 0:
+                successful_persons += 1
+                total_encodings += count
+            
+            logger.info("")
     
     logger.info("=" * 60)
     logger.info(f"Sync Complete!")
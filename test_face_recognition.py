@@ -17,11 +17,8 @@ def test_image(image_path):
         print(f"ERROR: Could not load image from {image_path}")
         return
     
-    # Convert BGR to RGB
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    
-    # Detect and identify faces
-    faces = detect_and_identify_faces(image_rgb)
+    # Detect and identify faces (InsightFace takes the BGR image directly)
+    faces = detect_and_identify_faces(image, bgr=True)
     
     print(f"\nFound {len(faces)} face(s):")
     for i, face in enumerate(faces, 1):
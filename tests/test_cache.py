@@ -0,0 +1,81 @@
+"""Tests for utils.cache.SimpleCache expiry"""
+
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import SimpleCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", fake)
+    return fake
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = SimpleCache(default_ttl=10)
+    cache.set("a", 1)
+    clock.now += 9
+    assert cache.get("a") == 1
+    clock.now += 2
+    assert cache.get("a") is None
+    assert "a" not in cache.cache
+
+
+def test_cleanup_expired_only_removes_expired(clock):
+    cache = SimpleCache(default_ttl=10)
+    cache.set("short", 1, ttl=5)
+    cache.set("long", 2, ttl=50)
+    clock.now += 6
+    cache.cleanup_expired()
+    assert set(cache.cache) == {"long"}
+    assert len(cache._expiry_heap) == 1
+
+
+def test_overwritten_key_keeps_its_new_expiry(clock):
+    cache = SimpleCache(default_ttl=10)
+    cache.set("a", 1, ttl=5)
+    cache.set("a", 2, ttl=50)
+    clock.now += 6
+    cache.cleanup_expired()
+    # The stale heap record for the first set() must not evict the new value
+    assert cache.get("a") == 2
+
+
+def test_set_reclaims_a_bounded_number_of_expired_entries(clock):
+    cache = SimpleCache(default_ttl=10)
+    for i in range(cache_module.EVICT_PER_SET * 3):
+        cache.set(f"k{i}", i, ttl=1)
+    clock.now += 2
+    cache.set("fresh", 0)
+    assert len(cache.cache) == cache_module.EVICT_PER_SET * 2 + 1
+    cache.cleanup_expired()
+    assert set(cache.cache) == {"fresh"}
+
+
+def test_expired_get_reclaims_other_expired_entries(clock):
+    cache = SimpleCache(default_ttl=10)
+    cache.set("a", 1, ttl=1)
+    cache.set("b", 2, ttl=1)
+    clock.now += 2
+    assert cache.get("a") is None
+    assert "b" not in cache.cache
+
+
+def test_deleted_key_leaves_no_entry_behind(clock):
+    cache = SimpleCache(default_ttl=10)
+    cache.set("a", 1, ttl=5)
+    cache.delete("a")
+    clock.now += 6
+    cache.cleanup_expired()
+    assert cache.cache == {}
+    assert cache._expiry_heap == []
@@ -0,0 +1,78 @@
+"""Tests for ComplianceManager: class-id lookups must agree with name classification"""
+
+import pytest
+
+from utils.compliance import STATUS_CODES, ComplianceManager
+
+NAMES = {0: "Pants", 1: "T-Shirt", 2: "ID Card", 3: "Hat", 4: "Shorts"}
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ComplianceManager(config_file=str(tmp_path / "compliance.json"))
+    manager.set_compliant_classes(["pants", "id card"])
+    manager.set_non_compliant_classes(["t-shirt", "shorts"])
+    return manager
+
+
+def _detections(pairs):
+    return [{"class": NAMES[cls_id], "class_id": cls_id, "confidence": conf}
+            for cls_id, conf in pairs]
+
+
+def _without_ids(detections):
+    return [{k: v for k, v in det.items() if k != "class_id"} for det in detections]
+
+
+@pytest.mark.parametrize("pairs", [
+    [(0, 0.9), (2, 0.8)],                # all compliant
+    [(0, 0.9), (1, 0.95)],               # one prohibited item
+    [(3, 0.9), (0, 0.7)],                # neutral item
+    [(1, 0.3), (0, 0.9)],                # prohibited but below min_confidence
+    [(4, 0.6), (1, 0.7), (4, 0.9)],      # duplicates
+])
+def test_check_compliance_by_id_matches_by_name(manager, pairs):
+    detections = _detections(pairs)
+    assert manager.check_compliance(detections, NAMES) == manager.check_compliance(_without_ids(detections))
+
+
+def test_status_codes_match_classify(manager):
+    detections = _detections([(i, 0.9) for i in NAMES])
+    codes = manager.status_codes(detections, NAMES)
+    expected = [STATUS_CODES[manager.classify(name)] for name in NAMES.values()]
+    assert codes.tolist() == expected
+
+
+def test_ids_from_another_model_are_rejected(manager):
+    other_model = {0: "Shorts", 1: "Pants"}
+    detections = _detections([(0, 0.9), (1, 0.9)])
+    assert manager.status_codes(detections, other_model) is None
+    # check_compliance falls back to the names, so the verdict is unchanged
+    assert manager.check_compliance(detections, other_model) == manager.check_compliance(detections)
+
+
+def test_out_of_range_ids_are_rejected(manager):
+    names = {0: "Pants"}
+    detections = [{"class": "Pants", "class_id": 0, "confidence": 0.9},
+                  {"class": "Shorts", "class_id": 7, "confidence": 0.9}]
+    assert manager.status_codes(detections, names) is None
+
+
+def test_rule_changes_rebuild_the_status_table(manager):
+    detections = _detections([(3, 0.9)])
+    assert manager.status_codes(detections, NAMES).tolist() == [0]
+    manager.add_non_compliant_class("hat")
+    assert manager.status_codes(detections, NAMES).tolist() == [-1]
+    compliant, non_compliant, _ = manager.check_compliance(detections, NAMES)
+    assert not compliant and non_compliant == ["Hat"]
+
+
+def test_status_table_is_cached_per_model_and_read_only(manager):
+    table, known = manager.status_table(NAMES)
+    assert manager.status_table(NAMES)[0] is table
+    assert known.tolist() == [True] * len(NAMES)
+    with pytest.raises(ValueError):
+        table[0] = 1
+    other = {0: "Hat"}
+    assert manager.status_table(other)[0].tolist() == [0]
+    assert manager.status_table(NAMES)[0] is table
@@ -0,0 +1,83 @@
+"""Tests for utils.dynamic_batcher.DynamicBatcher"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.dynamic_batcher import DynamicBatcher
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class RecordingDetector:
+    """Returns each "image" tagged with its position, and records batch sizes"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, images):
+        self.batches.append(list(images))
+        return [[{"image": image}] for image in images]
+
+
+def test_results_are_returned_to_their_own_requests():
+    detector = RecordingDetector()
+
+    async def scenario():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batcher = DynamicBatcher(detector, executor, max_batch=4, max_wait_ms=20)
+            batcher.start()
+            try:
+                return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+            finally:
+                await batcher.stop()
+
+    results = _run(scenario())
+    assert results == [[{"image": i}] for i in range(10)]
+    # Images keep submission order inside and across batches
+    flattened = [image for batch in detector.batches for image in batch]
+    assert flattened == list(range(10))
+    assert all(len(batch) <= 4 for batch in detector.batches)
+    assert len(detector.batches) < 10
+
+
+def test_lone_request_is_dispatched_after_max_wait():
+    detector = RecordingDetector()
+
+    async def scenario():
+        batcher = DynamicBatcher(detector, max_batch=8, max_wait_ms=5)
+        batcher.start()
+        try:
+            return await asyncio.wait_for(batcher.submit("only"), timeout=2)
+        finally:
+            await batcher.stop()
+
+    assert _run(scenario()) == [{"image": "only"}]
+    assert detector.batches == [["only"]]
+
+
+def test_batch_failure_is_raised_in_every_request():
+    def failing(images):
+        raise ValueError("boom")
+
+    async def scenario():
+        batcher = DynamicBatcher(failing, max_batch=4, max_wait_ms=5)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(3)),
+                                        return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    results = _run(scenario())
+    assert len(results) == 3
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_submit_requires_a_running_batcher():
+    batcher = DynamicBatcher(RecordingDetector())
+    with pytest.raises(RuntimeError):
+        _run(batcher.submit(0))
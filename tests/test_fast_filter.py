@@ -0,0 +1,46 @@
+"""Tests for utils.fast_filter: numba and NumPy paths must select the same boxes"""
+
+import numpy as np
+import pytest
+
+from utils import fast_filter
+
+
+def _reference(conf, cls, min_conf, allow_mask):
+    return np.array([c >= min_conf and 0 <= k < len(allow_mask) and bool(allow_mask[k])
+                     for c, k in zip(conf, cls)], dtype=np.bool_)
+
+
+def _cases():
+    rng = np.random.default_rng(0)
+    for n in (0, 1, 7, 64):
+        conf = rng.random(n).astype(np.float64)
+        cls = rng.integers(-2, 12, n).astype(np.int64)  # includes out-of-range ids
+        allow_mask = rng.random(10) > 0.4
+        yield conf, cls, 0.5, allow_mask
+    # Confidence exactly at the threshold is kept
+    yield np.array([0.5, 0.49]), np.array([0, 0]), 0.5, np.array([True])
+
+
+@pytest.mark.parametrize("conf, cls, min_conf, allow_mask", list(_cases()))
+def test_numpy_path_matches_reference(conf, cls, min_conf, allow_mask):
+    result = fast_filter._filter_boxes_numpy(conf, cls, min_conf, allow_mask)
+    assert result.dtype == np.bool_
+    assert result.tolist() == _reference(conf, cls, min_conf, allow_mask).tolist()
+
+
+@pytest.mark.skipif(not fast_filter.NUMBA_AVAILABLE, reason="numba not installed")
+@pytest.mark.parametrize("conf, cls, min_conf, allow_mask", list(_cases()))
+def test_numba_path_matches_numpy(conf, cls, min_conf, allow_mask):
+    expected = fast_filter._filter_boxes_numpy(conf, cls, min_conf, allow_mask)
+    result = fast_filter._filter_boxes_numba(conf, cls, min_conf, allow_mask)
+    assert result.tolist() == expected.tolist()
+
+
+def test_filter_boxes_does_not_modify_inputs():
+    conf = np.array([0.9, 0.1, 0.8])
+    cls = np.array([0, 1, 5])
+    allow_mask = np.array([True, True])
+    fast_filter.filter_boxes(conf, cls, 0.5, allow_mask)
+    assert conf.tolist() == [0.9, 0.1, 0.8]
+    assert cls.tolist() == [0, 1, 5]
@@ -0,0 +1,43 @@
+"""Tests for utils.label_trie"""
+
+from utils.label_trie import LabelTrie, build_trie, normalize_words
+
+
+def test_normalize_words_ignores_case_punctuation_and_spacing():
+    assert normalize_words("T-Shirt") == ["t", "shirt"]
+    assert normalize_words(" T  SHIRT ") == ["t", "shirt"]
+    assert normalize_words("") == []
+
+
+def test_exact_and_normalized_names_resolve():
+    trie = LabelTrie()
+    trie.insert("t shirt", "t-shirt")
+    assert trie.longest_prefix_match("T-Shirt") == "t-shirt"
+    assert trie.longest_prefix_match("t   shirt") == "t-shirt"
+
+
+def test_longest_prefix_wins():
+    trie = LabelTrie()
+    trie.insert("shirt", "shirt")
+    trie.insert("shirt full sleeves", "full sleeves shirt")
+    assert trie.longest_prefix_match("shirt") == "shirt"
+    assert trie.longest_prefix_match("Shirt (Full Sleeves)") == "full sleeves shirt"
+    # A longer name that only partly matches an entry falls back to the shorter one
+    assert trie.longest_prefix_match("shirt full") == "shirt"
+
+
+def test_unknown_names_resolve_to_none():
+    trie = LabelTrie()
+    trie.insert("pants", "pants")
+    assert trie.longest_prefix_match("shorts") is None
+    assert trie.longest_prefix_match("") is None
+    # Matching is by whole words, not character prefixes
+    assert trie.longest_prefix_match("pantsuit") is None
+
+
+def test_build_trie_maps_labels_and_variants():
+    trie = build_trie({"pants": ["trousers", "jeans"], "kurti": []})
+    assert trie.longest_prefix_match("Pants") == "pants"
+    assert trie.longest_prefix_match("Trousers") == "pants"
+    assert trie.longest_prefix_match("jeans") == "pants"
+    assert trie.longest_prefix_match("kurti") == "kurti"
@@ -0,0 +1,42 @@
+"""Tests for utils.phash"""
+
+import numpy as np
+
+from utils.phash import dhash, hamming_distance
+
+
+def _gradient(width=64, height=48):
+    row = np.linspace(0, 255, width, dtype=np.uint8)
+    return np.repeat(np.tile(row, (height, 1))[:, :, None], 3, axis=2)
+
+
+def test_hash_is_64_bit_and_deterministic():
+    frame = _gradient()
+    h = dhash(frame)
+    assert 0 <= h < 2 ** 64
+    assert dhash(frame.copy()) == h
+
+
+def test_left_to_right_gradient_sets_every_bit():
+    assert dhash(_gradient()) == 2 ** 64 - 1
+    assert dhash(_gradient()[:, ::-1]) == 0
+
+
+def test_grayscale_and_bgr_inputs_agree():
+    frame = _gradient()
+    assert dhash(frame[:, :, 0]) == dhash(frame)
+
+
+def test_small_noise_keeps_hash_close_and_scene_change_does_not():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    noisy = np.clip(frame.astype(np.int16) + rng.integers(-2, 3, frame.shape), 0, 255).astype(np.uint8)
+    other = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    assert hamming_distance(dhash(frame), dhash(noisy)) <= 6
+    assert hamming_distance(dhash(frame), dhash(other)) > 10
+
+
+def test_hamming_distance():
+    assert hamming_distance(0, 0) == 0
+    assert hamming_distance(0b1011, 0b0001) == 2
+    assert hamming_distance(0, 2 ** 64 - 1) == 64
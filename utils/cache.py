@@ -3,27 +3,50 @@ Simple in-memory caching for API responses
 Improves performance for repeated requests
 """
 from typing import Any, Optional
-from datetime import datetime, timedelta
 import hashlib
+import heapq
 import json
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Optional: xxh3 fingerprints keys far faster than MD5 (keys only need to be collision-resistant)
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# Optional: orjson serializes dict/list keys in C, straight to bytes
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Expired entries reclaimed per set() (and expired get()), so cleanup is spread across calls
+EVICT_PER_SET = 5
+
 class SimpleCache:
     """
     Simple in-memory cache with TTL support
     """
     
-    def __init__(self, default_ttl: int = 300):
+    def __init__(self, default_ttl: int = 300, max_entries: Optional[int] = None):
         """
         Initialize cache
         
         Args:
             default_ttl: Default time-to-live in seconds
+            max_entries: Optional size bound; the oldest entry is evicted when full
         """
-        self.cache = {}
+        self.cache = {}  # key -> (value, expires, created), times from time.monotonic()
+        self._expiry_heap = []  # (expires, key) min-heap so cleanup only touches expired entries
+        self._heap_lock = threading.Lock()  # cleanup_expired may run on a worker thread
         self.default_ttl = default_ttl
+        self.max_entries = max_entries
         self.hits = 0
         self.misses = 0
         
@@ -35,14 +58,19 @@ class SimpleCache:
             data: Data to generate key from
             
         Returns:
-            str: Cache key (MD5 hash)
+            str: Cache key (xxh3-64 hex digest, or MD5 without xxhash)
         """
         if isinstance(data, (dict, list)):
-            data_str = json.dumps(data, sort_keys=True)
+            if ORJSON_AVAILABLE:
+                data_bytes = orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+            else:
+                data_bytes = json.dumps(data, sort_keys=True).encode()
         else:
-            data_str = str(data)
+            data_bytes = str(data).encode()
         
-        return hashlib.md5(data_str.encode()).hexdigest()
+        if XXHASH_AVAILABLE:
+            return xxhash.xxh3_64_hexdigest(data_bytes)
+        return hashlib.md5(data_bytes).hexdigest()
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -58,18 +86,22 @@ class SimpleCache:
             self.misses += 1
             return None
         
-        entry = self.cache[key]
+        value, expires, _ = self.cache[key]
         
         # Check if expired
-        if datetime.now() > entry['expires']:
-            del self.cache[key]
+        now = time.monotonic()
+        if now > expires:
+            self.cache.pop(key, None)
             self.misses += 1
-            logger.debug(f"Cache expired for key: {key[:8]}...")
+            logger.debug("Cache expired for key: %.8s...", key)
+            # Something has expired, so others likely have too: reclaim a few while here
+            with self._heap_lock:
+                self._evict_expired(now, EVICT_PER_SET)
             return None
         
         self.hits += 1
-        logger.debug(f"Cache hit for key: {key[:8]}...")
-        return entry['value']
+        logger.debug("Cache hit for key: %.8s...", key)
+        return value
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None):
         """
@@ -81,15 +113,19 @@ class SimpleCache:
             ttl: Optional custom TTL in seconds
         """
         ttl = ttl or self.default_ttl
-        expires = datetime.now() + timedelta(seconds=ttl)
+        now = time.monotonic()
+        expires = now + ttl
         
-        self.cache[key] = {
-            'value': value,
-            'expires': expires,
-            'created': datetime.now()
-        }
+        # Evict the oldest entry (dicts keep insertion order) when at capacity
+        if self.max_entries and key not in self.cache and len(self.cache) >= self.max_entries:
+            del self.cache[next(iter(self.cache))]
         
-        logger.debug(f"Cached value for key: {key[:8]}... (TTL: {ttl}s)")
+        self.cache[key] = (value, expires, now)
+        with self._heap_lock:
+            heapq.heappush(self._expiry_heap, (expires, key))
+            self._evict_expired(now, EVICT_PER_SET)
+        
+        logger.debug("Cached value for key: %.8s... (TTL: %ss)", key, ttl)
     
     def delete(self, key: str):
         """
@@ -105,23 +141,49 @@ class SimpleCache:
     def clear(self):
         """Clear all cache entries"""
         self.cache.clear()
+        with self._heap_lock:
+            self._expiry_heap.clear()
         self.hits = 0
         self.misses = 0
         logger.info("Cache cleared")
     
     def cleanup_expired(self):
-        """Remove expired entries from cache"""
-        now = datetime.now()
-        expired_keys = [
-            key for key, entry in self.cache.items()
-            if now > entry['expires']
-        ]
-        
-        for key in expired_keys:
-            del self.cache[key]
+        """
+        Remove expired entries from cache
         
-        if expired_keys:
-            logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
+        Pops the expiry heap until the earliest remaining entry is still live,
+        so the cost is O(k log n) in the number of expired entries rather
+        than a scan of the whole cache.
+        """
+        with self._heap_lock:
+            removed = self._evict_expired(time.monotonic())
+        
+        if removed:
+            logger.info(f"Cleaned up {removed} expired cache entries")
+    
+    def _evict_expired(self, now: float, limit: Optional[int] = None) -> int:
+        """
+        Pop expired records off the expiry heap (caller holds _heap_lock)
+        
+        Args:
+            now: Current time.monotonic()
+            limit: Maximum heap records to pop (None = all expired)
+            
+        Returns:
+            int: Number of cache entries removed
+        """
+        heap = self._expiry_heap
+        removed = 0
+        popped = 0
+        while heap and heap[0][0] < now and (limit is None or popped < limit):
+            expires, key = heapq.heappop(heap)
+            popped += 1
+            entry = self.cache.get(key)
+            # Skip heap records left behind by overwritten or deleted keys
+            if entry is not None and entry[1] == expires:
+                self.cache.pop(key, None)
+                removed += 1
+        return removed
     
     def get_stats(self) -> dict:
         """
@@ -153,7 +215,7 @@ class SimpleCache:
         
         for entry in self.cache.values():
             total_size += sys.getsizeof(entry)
-            total_size += sys.getsizeof(entry['value'])
+            total_size += sys.getsizeof(entry[0])
         
         return total_size
 
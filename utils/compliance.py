@@ -1,11 +1,28 @@
-from config import COMPLIANT_CLOTHES, NON_COMPLIANT_CLOTHES, COMPLIANCE_RULES
+from config import (COMPLIANT_CLOTHES, NON_COMPLIANT_CLOTHES, COMPLIANCE_RULES,
+                    LABEL_TRIE)
 import logging
 import json
 import os
-from typing import Dict, Set, List, Tuple
+import sys
+import threading
+from functools import lru_cache
+import numpy as np
+from typing import Dict, Set, List, Optional, Tuple
+
+from utils.fast_filter import filter_boxes
 
 logger = logging.getLogger(__name__)
 
+# Numeric compliance codes used by the vectorized lookups
+STATUS_CODES = {"non_compliant": -1, "neutral": 0, "compliant": 1}
+_CODE_STATUS = ("neutral", "compliant", "non_compliant")  # Indexed by code (-1 wraps to the end)
+STATUS_TABLE_CACHE_SIZE = 8  # Models whose status tables are kept at once
+
+# Raw class name -> canonical label (or None). Names come from a fixed YOLO label
+# map, so after the first frame each resolution is one dict hit instead of a
+# regex normalize + trie walk
+_canonical_label = lru_cache(maxsize=512)(LABEL_TRIE.longest_prefix_match)
+
 
 class ComplianceManager:
     """Manages compliance rules with ability to dynamically update them"""
@@ -16,9 +33,11 @@ class ComplianceManager:
         self.compliant_classes = set(COMPLIANT_CLOTHES)
         self.non_compliant_classes = set(NON_COMPLIANT_CLOTHES)
         self.min_confidence = COMPLIANCE_RULES.get("min_confidence", 0.5)
+        self._table_lock = threading.Lock()  # Guards status table builds against rule refreshes
         
         # Load from file if exists
         self.load_config()
+        self._refresh_lookups()
     
     def load_config(self):
         """Load compliance configuration from file"""
@@ -29,12 +48,85 @@ class ComplianceManager:
                     self.compliant_classes = set(config.get("compliant", []))
                     self.non_compliant_classes = set(config.get("non_compliant", []))
                     self.min_confidence = config.get("min_confidence", 0.5)
+                    self._refresh_lookups()
                     logger.info(f"Loaded compliance config from {self.config_file}")
             except Exception as e:
                 logger.error(f"Error loading compliance config: {e}")
     
+    def _refresh_lookups(self):
+        """Rebuild the normalized frozen lookup sets after any rule change"""
+        with self._table_lock:
+            self._compliant_lower = frozenset(sys.intern(c.lower().strip()) for c in self.compliant_classes)
+            self._non_compliant_lower = frozenset(sys.intern(c.lower().strip()) for c in self.non_compliant_classes)
+            self._status_cache = {}  # Raw class name -> "compliant" / "non_compliant" / "neutral"
+            self._status_tables = {}  # id(names) -> (names, (codes, known)) per model
+            self._filtered_cache_by_model = {}  # model name -> config filtered to that model's classes
+    
+    def status_table(self, names: Dict[int, str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compliance codes and known-id mask indexed by YOLO class id, cached per model
+        
+        The pair is built under a lock and returned as one read-only tuple, so
+        a caller never mixes one model's codes with another model's mask, even
+        while the model is switched or the rules are refreshed.
+        
+        Args:
+            names: Model class names {class_id: name}
+            
+        Returns:
+            tuple: (codes, known) - int8 array with 1 (compliant), 0 (neutral) or
+                   -1 (non-compliant), and a bool mask of the ids present in names
+        """
+        entry = self._status_tables.get(id(names))
+        if entry is not None and entry[0] is names:
+            return entry[1]
+        with self._table_lock:
+            tables = self._status_tables
+            entry = tables.get(id(names))
+            if entry is not None and entry[0] is names:
+                return entry[1]
+            table = np.zeros(max(names, default=-1) + 1, dtype=np.int8)
+            known = np.zeros(len(table), dtype=np.bool_)
+            for cls_id, name in names.items():
+                table[cls_id] = STATUS_CODES[self.classify(name)]
+                known[cls_id] = True
+            table.flags.writeable = False
+            known.flags.writeable = False
+            if len(tables) >= STATUS_TABLE_CACHE_SIZE:
+                tables.clear()
+            pair = (table, known)
+            # names is kept in the entry so its id can't be reused while cached
+            tables[id(names)] = (names, pair)
+            return pair
+    
+    def classify(self, class_name: str) -> str:
+        """
+        Classify a detected class name against the current rules
+        
+        Results are memoized per raw class name, so the string normalization
+        only happens once per class until the rules change.
+        
+        Args:
+            class_name: Class name as reported by the model
+            
+        Returns:
+            str: "compliant", "non_compliant" or "neutral"
+        """
+        status = self._status_cache.get(class_name)
+        if status is None:
+            key = class_name.lower().strip()
+            if key in self._non_compliant_lower:
+                status = "non_compliant"
+            elif key in self._compliant_lower:
+                status = "compliant"
+            else:
+                status = "neutral"
+            self._status_cache[class_name] = status
+        return status
+    
     def save_config(self):
         """Save compliance configuration to file"""
+        self._refresh_lookups()
         try:
             config = {
                 "compliant": list(self.compliant_classes),
@@ -90,12 +182,88 @@ class ComplianceManager:
             "min_confidence": self.min_confidence
         }
     
-    def check_compliance(self, detected_clothes: List[Dict]) -> Tuple[bool, List[str], Dict]:
+    def get_config_for_model(self, model_name: str, model_classes_lower: frozenset) -> Dict:
+        """
+        Get the compliance configuration filtered to one model's classes
+        
+        The filtered view is computed once per model and reused until the
+        rules change. Callers must not mutate the returned dict.
+        
+        Args:
+            model_name: Model identifier (cache key)
+            model_classes_lower: Lowercased class names of that model
+            
+        Returns:
+            dict: Same shape as get_config(), restricted to the model's classes
+        """
+        config = self._filtered_cache_by_model.get(model_name)
+        if config is None:
+            config = self.get_config()
+            config["compliant_classes"] = [
+                c for c in config["compliant_classes"] if c in model_classes_lower
+            ]
+            config["non_compliant_classes"] = [
+                c for c in config["non_compliant_classes"] if c in model_classes_lower
+            ]
+            self._filtered_cache_by_model[model_name] = config
+        return config
+    
+    @staticmethod
+    def _class_ids(detected_clothes: List[Dict], names: Dict[int, str],
+                   table: np.ndarray) -> Optional[np.ndarray]:
+        """Class ids of the detections, or None if they don't belong to the model behind names"""
+        first = detected_clothes[0]
+        # Ids only mean something for the model that produced them
+        if "class_id" not in first or names.get(first["class_id"]) != first["class"]:
+            return None
+        ids = np.fromiter((item["class_id"] for item in detected_clothes), dtype=np.int64,
+                          count=len(detected_clothes))
+        if ids.min() < 0 or ids.max() >= len(table):
+            return None
+        return ids
+    
+    def status_codes(self, detected_clothes: List[Dict], names: Dict[int, str]) -> Optional[np.ndarray]:
+        """
+        Compliance codes for detections, looked up by class id
+        
+        Args:
+            detected_clothes: Non-empty list of detections with class and class_id
+            names: Class names of the model that produced them {class_id: name}
+            
+        Returns:
+            np.ndarray: int8 codes (1/0/-1) aligned with detected_clothes,
+                        or None if the ids don't belong to this model
+        """
+        table, _ = self.status_table(names)
+        ids = self._class_ids(detected_clothes, names, table)
+        return None if ids is None else table[ids]
+    
+    def _statuses_by_id(self, detected_clothes: List[Dict], names: Dict[int, str]):
+        """
+        Resolve every detection's status and confidence cut with array lookups
+        
+        Returns:
+            tuple: (statuses, confident) lists aligned with detected_clothes,
+                   or None if the ids don't belong to this model
+        """
+        table, known = self.status_table(names)
+        ids = self._class_ids(detected_clothes, names, table)
+        if ids is None:
+            return None
+        conf = np.fromiter((item.get("confidence", 0.0) for item in detected_clothes),
+                           dtype=np.float64, count=len(detected_clothes))
+        confident = filter_boxes(conf, ids, self.min_confidence, known)
+        return [_CODE_STATUS[code] for code in table[ids].tolist()], confident.tolist()
+    
+    def check_compliance(self, detected_clothes: List[Dict],
+                         names: Optional[Dict[int, str]] = None) -> Tuple[bool, List[str], Dict]:
         """
         Check if detected clothing items are compliant
         
         Args:
             detected_clothes: List of dictionaries containing detection results
+            names: Class names of the model that produced them {class_id: name};
+                   when given, statuses are resolved by class id in one lookup
             
         Returns:
             tuple: (is_compliant, non_compliant_items, details)
@@ -106,39 +274,48 @@ class ComplianceManager:
         compliant_items = []
         neutral_items = []
         
-        for item in detected_clothes:
-            class_name = item["class"].lower().strip()
+        resolved = None
+        if names and detected_clothes:
+            resolved = self._statuses_by_id(detected_clothes, names)
+        statuses, confident = resolved if resolved is not None else (None, None)
+        
+        classify = self.classify
+        min_confidence = self.min_confidence
+        for i, item in enumerate(detected_clothes):
+            class_name = item["class"]
             confidence = item.get("confidence", 0.0)
             
             # Track low confidence detections
-            if confidence < self.min_confidence:
+            is_confident = confident[i] if confident is not None else confidence >= min_confidence
+            if not is_confident:
                 low_confidence_items.append({
                     "class": item["class"],
                     "confidence": confidence
                 })
-                logger.debug(f"Skipping low-confidence detection: {class_name} ({confidence:.2f})")
+                logger.debug("Skipping low-confidence detection: %s (%.2f)", class_name, confidence)
                 continue
                 
             detected_classes.add(class_name)
+            status = statuses[i] if statuses is not None else classify(class_name)
             
             # Check if explicitly non-compliant
-            if class_name in self.non_compliant_classes:
+            if status == "non_compliant":
                 non_compliant_items.append({
                     "class": item["class"],
                     "confidence": confidence,
                     "reason": "Prohibited item"
                 })
-                logger.info(f"Non-compliant item detected: {class_name}")
+                logger.info("Non-compliant item detected: %s", class_name)
                 continue
                 
             # Check if compliant
-            if class_name in self.compliant_classes:
+            if status == "compliant":
                 compliant_items.append(item["class"])
                 continue
             
             # Item is neutral (not in either list)
             neutral_items.append(item["class"])
-            logger.info(f"Neutral item detected: {class_name}")
+            logger.info("Neutral item detected: %s", class_name)
         
         # Detailed report
         details = {
@@ -156,9 +333,9 @@ class ComplianceManager:
         
         is_compliant_result = len(non_compliant_items) == 0
         
-        logger.info(f"Compliance check: {'PASSED' if is_compliant_result else 'FAILED'} - "
-                    f"{len(compliant_items)} compliant, {len(non_compliant_items)} non-compliant, "
-                    f"{len(neutral_items)} neutral")
+        logger.info("Compliance check: %s - %d compliant, %d non-compliant, %d neutral",
+                    "PASSED" if is_compliant_result else "FAILED",
+                    len(compliant_items), len(non_compliant_items), len(neutral_items))
         
         return is_compliant_result, non_compliant_names, details
 
@@ -180,6 +357,14 @@ def is_compliant(detected_clothes):
     
     min_confidence = COMPLIANCE_RULES.get("min_confidence", 0.5)
     
+    # Fast path: resolve each confident detection once and compare with set
+    # algebra; the per-item report below is only needed when something fails
+    confident = [item for item in detected_clothes if item.get("confidence", 0.0) >= min_confidence]
+    resolved = {_canonical_label(item["class"]) for item in confident}
+    if not (resolved - COMPLIANT_CLOTHES):
+        logger.info("Compliance check: PASSED - %d compliant, 0 non-compliant", len(confident))
+        return True, []
+    
     for item in detected_clothes:
         class_name = item["class"].lower().strip()
         confidence = item.get("confidence", 0.0)
@@ -190,23 +375,24 @@ def is_compliant(detected_clothes):
                 "class": item["class"],
                 "confidence": confidence
             })
-            logger.debug(f"Skipping low-confidence detection: {class_name} ({confidence:.2f})")
+            logger.debug("Skipping low-confidence detection: %s (%.2f)", class_name, confidence)
             continue
             
         detected_classes.add(class_name)
+        canonical = _canonical_label(item["class"])
         
         # Check if explicitly non-compliant
-        if class_name in NON_COMPLIANT_CLOTHES:
+        if canonical in NON_COMPLIANT_CLOTHES:
             non_compliant_items.append({
                 "class": item["class"],
                 "confidence": confidence,
                 "reason": "Prohibited item"
             })
-            logger.info(f"Non-compliant item detected: {class_name}")
+            logger.info("Non-compliant item detected: %s", class_name)
             continue
             
-        # Check if this class is directly compliant
-        if class_name in COMPLIANT_CLOTHES:
+        # Check if this class (or one of its variants) is compliant
+        if canonical in COMPLIANT_CLOTHES:
             compliant_items.append(item["class"])
             continue
             
@@ -216,7 +402,7 @@ def is_compliant(detected_clothes):
             "confidence": confidence,
             "reason": "Not in approved list"
         })
-        logger.info(f"Unknown/non-compliant item: {class_name}")
+        logger.info("Unknown/non-compliant item: %s", class_name)
     
     # Generate detailed compliance report
     compliance_report = {
@@ -235,8 +421,9 @@ def is_compliant(detected_clothes):
     
     is_compliant_result = len(non_compliant_items) == 0
     
-    logger.info(f"Compliance check: {'PASSED' if is_compliant_result else 'FAILED'} - "
-                f"{len(compliant_items)} compliant, {len(non_compliant_items)} non-compliant")
+    logger.info("Compliance check: %s - %d compliant, %d non-compliant",
+                "PASSED" if is_compliant_result else "FAILED",
+                len(compliant_items), len(non_compliant_items))
     
     return is_compliant_result, non_compliant_names
 
@@ -259,7 +446,6 @@ def get_compliance_details(detected_clothes):
     min_confidence = COMPLIANCE_RULES.get("min_confidence", 0.5)
     
     for item in detected_clothes:
-        class_name = item["class"].lower().strip()
         confidence = item.get("confidence", 0.0)
         
         detection_info = {
@@ -273,10 +459,11 @@ def get_compliance_details(detected_clothes):
             continue
         
         # Check categories
-        if class_name in NON_COMPLIANT_CLOTHES:
+        canonical = _canonical_label(item["class"])
+        if canonical in NON_COMPLIANT_CLOTHES:
             detection_info["reason"] = "Prohibited item"
             non_compliant_items.append(detection_info)
-        elif class_name in COMPLIANT_CLOTHES:
+        elif canonical in COMPLIANT_CLOTHES:
             detection_info["category"] = "Direct match"
             compliant_items.append(detection_info)
         else:
@@ -75,7 +75,7 @@ class DistanceChecker:
             }
         
         # Get largest face (assume it's the person we want to detect)
-        largest_face = max(faces, key=lambda f: f[2] * f[3])
+        largest_face = faces[int(np.argmax(faces[:, 2] * faces[:, 3]))]
         fx, fy, fw, fh = largest_face
         
         # Calculate body metrics
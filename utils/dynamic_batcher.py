@@ -0,0 +1,117 @@
+"""
+Dynamic micro-batching for detection requests
+Groups concurrent requests so the model runs one batched forward pass instead of many
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from config import BATCH_MAX, BATCH_MAX_WAIT_MS
+
+logger = logging.getLogger(__name__)
+
+
+class DynamicBatcher:
+    """
+    Collects images submitted from request handlers and runs them in batches
+
+    A batch is dispatched as soon as it holds max_batch images, or max_wait_ms
+    after its first image arrived, whichever comes first.
+    """
+
+    def __init__(self, detect_batch_fn: Callable[[List[np.ndarray]], List[list]],
+                 executor: Optional[Executor] = None,
+                 max_batch: int = BATCH_MAX, max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        """
+        Initialize batcher
+
+        Args:
+            detect_batch_fn: Blocking function mapping a list of images to a list of detections
+            executor: Executor the batch function runs in (None = default loop executor)
+            max_batch: Maximum images per batch
+            max_wait_ms: Maximum time to wait for a batch to fill
+        """
+        self.detect_batch_fn = detect_batch_fn
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background batching task (call from a running event loop)"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Dynamic batcher started (max_batch={self.max_batch}, max_wait={self.max_wait * 1000:.0f}ms)")
+
+    async def stop(self):
+        """Stop the background task, failing any requests still queued"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+
+    async def submit(self, image: np.ndarray) -> list:
+        """
+        Queue an image for detection and wait for its result
+
+        Args:
+            image: Input image as numpy array
+
+        Returns:
+            list: Detection dictionaries for this image
+        """
+        if self._task is None:
+            raise RuntimeError("Batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    async def _run(self):
+        """Drain the queue into batches and dispatch them"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            # Requests that queued up during the previous batch join without waiting
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            images = [image for image, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.detect_batch_fn, images)
+            except Exception as e:
+                logger.error(f"Batched detection failed: {e}", exc_info=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), detections in zip(batch, results):
+                # The request may have been cancelled while the batch ran
+                if not future.done():
+                    future.set_result(detections)
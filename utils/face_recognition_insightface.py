@@ -11,6 +11,8 @@ import cv2
 import os
 import logging
 
+from config import FACE_DET_SIZE
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -35,7 +37,20 @@ KNOWN_USERS_SET = "known_users"
 FACE_MATCH_THRESHOLD = 0.4  # Cosine similarity threshold (lowered for better matching)
 MIN_FACE_SIZE = 40  # Minimum face size to detect
 
+# Stored embeddings are raw float32 bytes: ArcFace (buffalo_s) vectors have a fixed (512,) shape,
+# so each one is exactly 2048 bytes and reads back with np.frombuffer(b, dtype=np.float32)
+EMBEDDING_DIM = 512
+EMBEDDING_BYTES = EMBEDDING_DIM * np.dtype(np.float32).itemsize
+
+def decode_embedding(encoding_bytes):
+    """Decode one stored embedding, accepting raw float32 bytes and legacy pickles"""
+    if len(encoding_bytes) == EMBEDDING_BYTES:
+        return np.frombuffer(encoding_bytes, dtype=np.float32)
+    return pickle.loads(encoding_bytes)
+
 # Initialize InsightFace model (lazy loading)
+# Detection runs at FACE_DET_SIZE (frames are downscaled inside the detector);
+# embeddings are still computed from aligned crops of the full-resolution frame
 face_app = None
 
 def get_face_app():
@@ -54,7 +69,7 @@ def get_face_app():
                     name='buffalo_s',  # Lightweight model with MobileFaceNet
                     providers=['CUDAExecutionProvider', 'CPUExecutionProvider']
                 )
-                face_app.prepare(ctx_id=0, det_size=(640, 640))
+                face_app.prepare(ctx_id=0, det_size=(FACE_DET_SIZE, FACE_DET_SIZE))
                 logger.info("InsightFace initialized with buffalo_s (GPU mode)")
             except:
                 # Fallback to CPU only
@@ -62,7 +77,7 @@ def get_face_app():
                     name='buffalo_s',
                     providers=['CPUExecutionProvider']
                 )
-                face_app.prepare(ctx_id=-1, det_size=(640, 640))
+                face_app.prepare(ctx_id=-1, det_size=(FACE_DET_SIZE, FACE_DET_SIZE))
                 logger.info("InsightFace initialized with buffalo_s (CPU mode)")
         except Exception as e:
             logger.error(f"Failed to initialize InsightFace: {e}")
@@ -70,6 +85,46 @@ def get_face_app():
     
     return face_app
 
+def load_user_embeddings(user_ids):
+    """
+    Fetch every user's stored embeddings as float32 matrices
+    
+    Users enrolled as one stacked matrix (user:{id}:emb + user:{id}:shape) are
+    read with a single pipelined round trip; users still stored as a list of
+    vectors (user:{id}:encodings, raw float32 or legacy pickles) fall back to LRANGE.
+    
+    Args:
+        user_ids: User IDs to load
+        
+    Returns:
+        dict: {user_id: np.ndarray of shape (N, D)}
+    """
+    with r.pipeline() as pipe:
+        for user_id in user_ids:
+            pipe.get(f"user:{user_id}:emb")
+            pipe.get(f"user:{user_id}:shape")
+        replies = pipe.execute()
+    
+    embeddings = {}
+    legacy_ids = []
+    for user_id, matrix_bytes, shape in zip(user_ids, replies[0::2], replies[1::2]):
+        if matrix_bytes is None or shape is None:
+            legacy_ids.append(user_id)
+            continue
+        rows, dim = (int(n) for n in shape.decode('utf-8').split('x'))
+        embeddings[user_id] = np.frombuffer(matrix_bytes, dtype=np.float32).reshape(rows, dim)
+    
+    if legacy_ids:
+        with r.pipeline() as pipe:
+            for user_id in legacy_ids:
+                pipe.lrange(f"user:{user_id}:encodings", 0, -1)
+            replies = pipe.execute()
+        for user_id, encodings in zip(legacy_ids, replies):
+            vectors = [decode_embedding(encoding_bytes) for encoding_bytes in encodings]
+            embeddings[user_id] = np.asarray(vectors, dtype=np.float32)
+    
+    return embeddings
+
 def recognize_face(face_embedding):
     """
     Finds the best match for a face embedding from the Redis database.
@@ -97,22 +152,17 @@ def recognize_face(face_embedding):
             logger.warning("No users found in Redis database")
             return "Unknown", 0.0, None
         
-        for user_id in known_user_ids:
-            encoding_list_key = f"user:{user_id}:encodings"
-            stored_encodings_bytes = r.lrange(encoding_list_key, 0, -1)
+        for user_id, embeddings in load_user_embeddings(known_user_ids).items():
+            if len(embeddings) == 0:
+                continue
+            
+            # Normalize stored encodings as well, then cosine similarity in one matmul
+            norms = np.linalg.norm(embeddings, axis=1)
+            similarity = float(np.max((embeddings @ face_embedding) / norms))
             
-            for encoding_bytes in stored_encodings_bytes:
-                stored_encoding = pickle.loads(encoding_bytes)
-                
-                # Normalize stored encoding as well
-                stored_encoding = stored_encoding / np.linalg.norm(stored_encoding)
-                
-                # Compute cosine similarity
-                similarity = np.dot(face_embedding, stored_encoding)
-                
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_match_id = user_id
+            if similarity > best_similarity:
+                best_similarity = similarity
+                best_match_id = user_id
         
         confidence = best_similarity * 100  # Convert to percentage
         
@@ -129,13 +179,15 @@ def recognize_face(face_embedding):
         logger.error(f"Error in face recognition: {e}")
         return "Unknown", 0.0, None
 
-def detect_and_identify_faces(image_array):
+def detect_and_identify_faces(image_array, bgr: bool = False):
     """
     Detect faces in an image and identify them using InsightFace.
     MUCH faster than dlib-based face_recognition library.
     
     Args:
-        image_array: numpy array (RGB or BGR format)
+        image_array: numpy array (RGB by default)
+        bgr: True if image_array is already BGR (e.g. straight from cv2);
+            skips the color conversion since InsightFace works in BGR
         
     Returns:
         List of dictionaries with face info:
@@ -159,8 +211,8 @@ def detect_and_identify_faces(image_array):
     
     try:
         # Convert RGB to BGR if needed (InsightFace expects BGR)
-        if len(image_array.shape) == 3 and image_array.shape[2] == 3:
-            # Assume input is RGB, convert to BGR
+        if not bgr and len(image_array.shape) == 3 and image_array.shape[2] == 3:
+            # Input is RGB, convert to BGR
             image_bgr = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
         else:
             image_bgr = image_array
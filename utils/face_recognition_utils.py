@@ -23,6 +23,16 @@ KNOWN_USERS_SET = "known_users"
 # Configuration
 FACE_MATCH_THRESHOLD = 0.6
 
+# Encodings are stored as raw float16 bytes (128 * 2 = 256 B); older entries are pickled float64
+ENCODING_DIM = 128
+ENCODING_DTYPE = np.float16
+
+def decode_stored_encoding(encoding_bytes):
+    """Decode one stored encoding, accepting both raw float16 bytes and legacy pickles"""
+    if len(encoding_bytes) == ENCODING_DIM * np.dtype(ENCODING_DTYPE).itemsize:
+        return np.frombuffer(encoding_bytes, dtype=ENCODING_DTYPE).astype(np.float32)
+    return pickle.loads(encoding_bytes)
+
 def recognize_face(unknown_encoding):
     """
     Finds the best match for an unknown face encoding from the Redis database.
@@ -47,7 +57,7 @@ def recognize_face(unknown_encoding):
             stored_encodings_bytes = r.lrange(encoding_list_key, 0, -1)
             
             for encoding_bytes in stored_encodings_bytes:
-                stored_encoding = pickle.loads(encoding_bytes)
+                stored_encoding = decode_stored_encoding(encoding_bytes)
                 distance = np.linalg.norm(unknown_encoding - stored_encoding)
                 
                 if distance < best_distance:
@@ -0,0 +1,55 @@
+"""
+Compiled per-box filters over detection arrays
+Uses numba when installed and falls back to equivalent NumPy expressions
+"""
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Optional: numba compiles the box loop to native code
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def _filter_boxes_numpy(conf: np.ndarray, cls: np.ndarray, min_conf: float,
+                        allow_mask: np.ndarray) -> np.ndarray:
+    in_range = (cls >= 0) & (cls < allow_mask.shape[0])
+    keep = (conf >= min_conf) & in_range
+    keep[keep] = allow_mask[cls[keep]]
+    return keep
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _filter_boxes_numba(conf, cls, min_conf, allow_mask):
+        n = conf.shape[0]
+        out = np.empty(n, np.bool_)
+        for i in range(n):
+            c = cls[i]
+            out[i] = conf[i] >= min_conf and 0 <= c < allow_mask.shape[0] and allow_mask[c]
+        return out
+
+
+def filter_boxes(conf: np.ndarray, cls: np.ndarray, min_conf: float,
+                 allow_mask: np.ndarray) -> np.ndarray:
+    """
+    Select boxes that are confident enough and belong to an allowed class
+
+    Args:
+        conf: Confidence per box (float)
+        cls: Class id per box (int)
+        min_conf: Minimum confidence to keep a box
+        allow_mask: Bool array indexed by class id; out-of-range ids are rejected
+
+    Returns:
+        np.ndarray: Bool mask over the boxes
+    """
+    if NUMBA_AVAILABLE:
+        return _filter_boxes_numba(conf, cls, min_conf, allow_mask)
+    return _filter_boxes_numpy(conf, cls, min_conf, allow_mask)
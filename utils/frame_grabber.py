@@ -0,0 +1,118 @@
+"""
+Background camera capture
+Decouples cv2.VideoCapture reads from frame processing so the newest frame is always ready
+"""
+
+import logging
+import queue
+import sys
+import threading
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def open_camera(index: int) -> cv2.VideoCapture:
+    """
+    Open a camera, going straight to V4L2 on Linux
+    
+    Naming the backend skips OpenCV's backend probing on open, and V4L2
+    honors CAP_PROP_BUFFERSIZE, so the driver's frame queue can be cut to
+    one buffer instead of backlogging several stale frames. Falls back to
+    OpenCV's default backend when V4L2 can't open the device.
+    
+    Args:
+        index: Camera index (/dev/video{index} on Linux)
+        
+    Returns:
+        cv2.VideoCapture: Capture (check isOpened())
+    """
+    if sys.platform.startswith("linux"):
+        cap = cv2.VideoCapture(index, cv2.CAP_V4L2)
+        if cap.isOpened():
+            return cap
+        cap.release()
+    return cv2.VideoCapture(index)
+
+
+class FrameGrabber:
+    """
+    Reads frames on a background thread into a depth-1 queue
+
+    When processing is slower than the camera, older frames are dropped so
+    read() always returns the freshest frame instead of a stale buffered one.
+    Skipped frames are only grab()bed, so they are never decoded.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, timeout: float = 2.0, skip_frames: int = 0):
+        """
+        Initialize grabber
+
+        Args:
+            cap: Opened video capture
+            timeout: Seconds read() waits for a frame before reporting failure
+            skip_frames: Frames to drop between delivered ones (0 = deliver every frame)
+        """
+        self.cap = cap
+        self.timeout = timeout
+        self.skip_frames = skip_frames
+        self._queue = queue.Queue(maxsize=1)
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "FrameGrabber":
+        """Start the capture thread"""
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, name="WebcamCapture", daemon=True)
+        self._thread.start()
+        return self
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Get the newest frame (same contract as cv2.VideoCapture.read)
+
+        Returns:
+            tuple: (ret, frame)
+        """
+        try:
+            return self._queue.get(timeout=self.timeout)
+        except queue.Empty:
+            return False, None
+
+    def stop(self):
+        """Stop the capture thread and wait for it to exit"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout)
+            self._thread = None
+
+    def _capture_loop(self):
+        """Read frames as fast as the camera delivers them, keeping only the latest"""
+        frame_count = 0
+        while self._running:
+            # grab() advances the stream without decoding; retrieve() only for kept frames
+            ret = self.cap.grab()
+            keep = frame_count % (self.skip_frames + 1) == 0
+            frame_count += 1
+            if ret and not keep:
+                continue
+            frame = self.cap.retrieve()[1] if ret else None
+            ret = ret and frame is not None
+            self._put_latest((ret, frame))
+            if not ret:
+                logger.warning("Capture thread stopped: failed to grab frame")
+                break
+
+    def _put_latest(self, item):
+        """Replace any unread frame with this one"""
+        try:
+            self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            pass
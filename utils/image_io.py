@@ -0,0 +1,367 @@
+"""
+Image decoding helpers for uploaded files
+Keeps decode work proportional to what the detector actually needs
+"""
+
+import cv2
+import numpy as np
+from collections import OrderedDict
+from typing import Optional, Tuple
+import inspect
+import logging
+import threading
+
+from config import YOLO_IMAGE_SIZE, ENABLE_GPU, GPU_DECODE_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# Optional: libjpeg-turbo SIMD codec (needs the PyTurboJPEG package and libturbojpeg)
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+    _tj = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+    # In-place decoding into a caller-owned array (PyTurboJPEG >= 1.7)
+    _TJ_DST_SUPPORTED = "dst" in inspect.signature(_tj.decode).parameters
+except (ImportError, OSError, RuntimeError):
+    _tj = None
+    TURBOJPEG_AVAILABLE = False
+    _TJ_DST_SUPPORTED = False
+
+# Optional: nvImageCodec GPU decoder (hardware JPEG engine on recent NVIDIA GPUs)
+try:
+    from nvidia import nvimgcodec
+    _nv_decoder = nvimgcodec.Decoder() if (ENABLE_GPU and GPU_DECODE_ENABLED) else None
+    _nv_params = nvimgcodec.DecodeParams(apply_exif_orientation=True) if _nv_decoder else None
+    NVIMGCODEC_AVAILABLE = _nv_decoder is not None
+except (ImportError, RuntimeError):
+    _nv_decoder = None
+    NVIMGCODEC_AVAILABLE = False
+
+# Optional: libspng-based PNG decoder (faster than OpenCV's libpng path)
+try:
+    import pyspng
+    PYSPNG_AVAILABLE = True
+except ImportError:
+    PYSPNG_AVAILABLE = False
+
+# Optional: nvJPEG encoding on the GPU through torchvision
+try:
+    import torch
+    from torchvision.io import encode_jpeg as _tv_encode_jpeg
+    NVJPEG_AVAILABLE = torch.cuda.is_available()
+except ImportError:
+    NVJPEG_AVAILABLE = False
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...) that carry the image size
+_SOF_MARKERS = frozenset({0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                          0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF})
+
+# Leading signature bytes of each accepted upload format
+_MAGIC_SIGNATURES = (
+    ("jpeg", 0, b"\xff\xd8\xff"),
+    ("png", 0, b"\x89PNG\r\n\x1a\n"),
+    ("bmp", 0, b"BM"),
+    ("webp", 8, b"WEBP"),
+)
+
+# libjpeg DCT scaling: decode directly at 1/N resolution
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Reusable decode destinations, keyed by (height, width, 3); least recently used shapes are dropped
+_DST_MAX_SHAPES = 8
+_DST_PER_SHAPE = 4
+_dst_buffers: "OrderedDict[tuple, list]" = OrderedDict()
+_dst_lock = threading.Lock()
+
+
+def _take_dst(shape: tuple) -> np.ndarray:
+    """Borrow a uint8 array of the given shape, allocating one if none is idle"""
+    with _dst_lock:
+        idle = _dst_buffers.get(shape)
+        if idle:
+            _dst_buffers.move_to_end(shape)
+            return idle.pop()
+    return np.empty(shape, dtype=np.uint8)
+
+
+def release_decode_buffer(image: Optional[np.ndarray]):
+    """
+    Return a decoded image to the destination pool once nothing uses it anymore
+
+    Args:
+        image: Array returned by decode_upload (ignored if None or not a plain BGR image)
+    """
+    if image is None or image.dtype != np.uint8 or image.ndim != 3 or not image.flags.owndata:
+        return
+    with _dst_lock:
+        idle = _dst_buffers.setdefault(image.shape, [])
+        _dst_buffers.move_to_end(image.shape)
+        if len(idle) < _DST_PER_SHAPE:
+            idle.append(image)
+        while len(_dst_buffers) > _DST_MAX_SHAPES:
+            _dst_buffers.popitem(last=False)
+
+
+def sniff_image_type(content: bytes) -> Optional[str]:
+    """
+    Identify an image format from its magic bytes
+
+    Args:
+        content: Raw file bytes (the first 12 bytes are enough)
+
+    Returns:
+        "jpeg", "png", "bmp", "webp" or None if unrecognized
+    """
+    for kind, offset, signature in _MAGIC_SIGNATURES:
+        if content[offset:offset + len(signature)] == signature:
+            if kind == "webp" and content[:4] != b"RIFF":
+                continue
+            return kind
+    return None
+
+
+def jpeg_dimensions(content: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Read width and height from a JPEG header without decoding it
+
+    Args:
+        content: Raw file bytes
+
+    Returns:
+        (width, height) or None if the data is not a parsable JPEG
+    """
+    header = _jpeg_header(content)
+    return header[:2] if header else None
+
+
+def image_dimensions(content: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Read width and height from the file header without decoding pixels
+
+    Supports JPEG (via TurboJPEG's header reader when available), PNG and BMP.
+
+    Args:
+        content: Raw file bytes
+
+    Returns:
+        (width, height) or None if the format/header is not recognized
+    """
+    kind = sniff_image_type(content)
+    if kind == "jpeg":
+        if TURBOJPEG_AVAILABLE:
+            try:
+                width, height, _, _ = _tj.decode_header(content)
+                return width, height
+            except Exception:
+                pass
+        return jpeg_dimensions(content)
+    if kind == "png" and content[12:16] == b"IHDR":
+        return int.from_bytes(content[16:20], "big"), int.from_bytes(content[20:24], "big")
+    if kind == "bmp" and len(content) >= 26:
+        # BITMAPINFOHEADER: signed 32-bit, height is negative for top-down bitmaps
+        width = int.from_bytes(content[18:22], "little", signed=True)
+        height = int.from_bytes(content[22:26], "little", signed=True)
+        return abs(width), abs(height)
+    return None
+
+
+def _jpeg_header(content: bytes) -> Optional[Tuple[int, int, bool]]:
+    """Scan JPEG markers up to the frame header; returns (width, height, has_exif)"""
+    if content[:2] != b"\xff\xd8":
+        return None
+    has_exif = False
+
+    i = 2
+    n = len(content)
+    while i + 9 < n:
+        if content[i] != 0xFF:
+            return None
+        marker = content[i + 1]
+
+        # Fill bytes and standalone markers have no length field
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+
+        if marker in _SOF_MARKERS:
+            height = int.from_bytes(content[i + 5:i + 7], "big")
+            width = int.from_bytes(content[i + 7:i + 9], "big")
+            return width, height, has_exif
+
+        # APP1 segment may carry an EXIF orientation tag
+        if marker == 0xE1 and content[i + 4:i + 8] == b"Exif":
+            has_exif = True
+
+        i += 2 + int.from_bytes(content[i + 2:i + 4], "big")
+
+    return None
+
+
+def _byte_view(content: bytes) -> np.ndarray:
+    """Zero-copy, read-only uint8 view over the upload buffer (for OpenCV only)"""
+    view = np.frombuffer(content, np.uint8)
+    view.flags.writeable = False
+    return view
+
+
+def _decode_jpeg(content: bytes, min_side: int):
+    """JPEG decoder: TurboJPEG or OpenCV at reduced DCT scale; None to fall back to a full decode"""
+    header = _jpeg_header(content)
+    if not header:
+        return None
+
+    width, height, has_exif = header
+    if NVIMGCODEC_AVAILABLE:
+        decoded = _decode_jpeg_gpu(content)
+        if decoded is not None:
+            return decoded
+
+    # TurboJPEG ignores EXIF orientation, so leave those files to OpenCV
+    if TURBOJPEG_AVAILABLE and not has_exif:
+        factor = next((f for f, _ in _REDUCED_FLAGS if max(width, height) // f >= min_side), 1)
+        # Decode straight into a pooled array of the scaled size (TurboJPEG rounds up)
+        dst = _take_dst((-(-height // factor), -(-width // factor), 3)) if _TJ_DST_SUPPORTED else None
+        extra = {"dst": dst} if dst is not None else {}
+        try:
+            image = _tj.decode(content, pixel_format=TJPF_BGR, scaling_factor=(1, factor), **extra)
+            logger.debug("Decoded %dx%d JPEG at 1/%d scale (TurboJPEG)", width, height, factor)
+            return image, width, height, factor
+        except Exception as e:
+            logger.debug("TurboJPEG decode failed, falling back to OpenCV: %s", e)
+            release_decode_buffer(dst)
+
+    nparr = _byte_view(content)
+    for factor, flag in _REDUCED_FLAGS:
+        if max(width, height) // factor >= min_side:
+            image = cv2.imdecode(nparr, flag)
+            if image is None:
+                break
+            # EXIF orientation may have rotated the decoded image
+            dh, dw = image.shape[:2]
+            if (dw >= dh) != (width >= height):
+                width, height = height, width
+            logger.debug("Decoded %dx%d JPEG at 1/%d scale", width, height, factor)
+            return image, width, height, factor
+
+    return None
+
+
+def _decode_jpeg_gpu(content: bytes):
+    """Full-resolution JPEG decode on the GPU with nvImageCodec; None on failure"""
+    try:
+        nv_image = _nv_decoder.decode(_byte_view(content), params=_nv_params)
+        if nv_image is None:
+            return None
+        # Decoded RGB lives on the device; only the final BGR frame is copied back
+        image = cv2.cvtColor(np.asarray(nv_image.cpu()), cv2.COLOR_RGB2BGR)
+    except Exception as e:
+        logger.debug("nvImageCodec decode failed, falling back to CPU: %s", e)
+        return None
+
+    height, width = image.shape[:2]
+    logger.debug("Decoded %dx%d JPEG on the GPU (nvImageCodec)", width, height)
+    return image, width, height, 1
+
+
+def _decode_png(content: bytes, min_side: int):
+    """PNG decoder: pyspng when installed; None to fall back to OpenCV"""
+    if not PYSPNG_AVAILABLE:
+        return None
+    try:
+        image = pyspng.load(bytes(content))
+    except Exception as e:
+        logger.debug("pyspng decode failed, falling back to OpenCV: %s", e)
+        return None
+    # 16-bit PNGs are left to OpenCV, which converts them to 8-bit
+    if image.dtype != np.uint8:
+        return None
+
+    conversion = {2: cv2.COLOR_GRAY2BGR, 3: cv2.COLOR_RGB2BGR, 4: cv2.COLOR_RGBA2BGR}
+    channels = 2 if image.ndim == 2 else image.shape[2]
+    image = cv2.cvtColor(image, conversion[channels])
+    height, width = image.shape[:2]
+    return image, width, height, 1
+
+
+def _decode_opencv(content: bytes):
+    """Generic full-resolution decode for any format OpenCV understands"""
+    image = cv2.imdecode(_byte_view(content), cv2.IMREAD_COLOR)
+    if image is None:
+        return None, 0, 0, 1
+
+    height, width = image.shape[:2]
+    return image, width, height, 1
+
+
+# Format-specific fast paths, keyed by sniff_image_type(); everything else uses OpenCV
+_DECODERS = {
+    "jpeg": _decode_jpeg,
+    "png": _decode_png,
+}
+
+
+def decode_upload(content: bytes, min_side: int = YOLO_IMAGE_SIZE):
+    """
+    Decode an uploaded image, using reduced-resolution JPEG decoding when possible
+
+    The format is sniffed from magic bytes and dispatched through _DECODERS.
+    JPEGs are decoded on the GPU with nvImageCodec when available, otherwise
+    by TurboJPEG (which reads the bytes directly) and large ones are
+    decoded at 1/2, 1/4 or 1/8 scale (picking the smallest that keeps the
+    long side >= min_side), since YOLO resizes to its input size anyway.
+    PNGs use pyspng when installed. Everything else, and any fast path that
+    declines, is decoded at full resolution with OpenCV.
+
+    Args:
+        content: Raw file bytes
+        min_side: Smallest long side the decoded image may have
+
+    Returns:
+        tuple: (image, original_width, original_height, scale) where scale is the
+               factor to multiply coordinates on the decoded image by to get
+               original-image coordinates. image is None if decoding failed.
+               Pass image to release_decode_buffer() when done to recycle it.
+    """
+    decoder = _DECODERS.get(sniff_image_type(content))
+    if decoder is not None:
+        decoded = decoder(content, min_side)
+        if decoded is not None:
+            return decoded
+
+    return _decode_opencv(content)
+
+
+def encode_jpeg(frame: np.ndarray, quality: int, gpu: bool = False) -> Optional[bytes]:
+    """
+    Encode a BGR frame as JPEG, using nvJPEG or TurboJPEG when available
+
+    Args:
+        frame: BGR image
+        quality: JPEG quality (0-100)
+        gpu: Encode on the GPU with nvJPEG (frees CPU for inference)
+
+    Returns:
+        bytes: Encoded JPEG, or None if encoding failed
+    """
+    if gpu and NVJPEG_AVAILABLE:
+        try:
+            tensor = torch.from_numpy(frame).cuda(non_blocking=True).permute(2, 0, 1).flip(0)  # HWC BGR -> CHW RGB
+            return _tv_encode_jpeg(tensor.contiguous(), quality=quality).cpu().numpy().tobytes()
+        except Exception as e:
+            logger.debug("nvJPEG encode failed, falling back to CPU: %s", e)
+
+    if TURBOJPEG_AVAILABLE:
+        try:
+            return _tj.encode(frame, quality=quality, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420)
+        except Exception as e:
+            logger.debug("TurboJPEG encode failed, falling back to OpenCV: %s", e)
+
+    ret, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ret else None
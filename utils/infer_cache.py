@@ -0,0 +1,52 @@
+"""
+Inference result cache
+Skips the YOLO forward pass for repeated uploads and near-identical webcam frames
+"""
+
+import hashlib
+import cv2
+import numpy as np
+
+from config import CACHE_TTL_SECONDS
+from utils.cache import SimpleCache
+
+# Bounded so a busy webcam stream cannot grow the cache without limit
+_inference_cache = SimpleCache(default_ttl=CACHE_TTL_SECONDS, max_entries=512)
+
+
+def get_inference_cache() -> SimpleCache:
+    """Get global inference cache instance"""
+    return _inference_cache
+
+
+def content_key(content: bytes, model_name: str) -> str:
+    """
+    Cache key for an uploaded file (hash of the raw bytes, before decoding)
+    
+    Args:
+        content: Raw file bytes
+        model_name: Model the detections belong to
+        
+    Returns:
+        str: Cache key
+    """
+    return f"{model_name}:{hashlib.blake2b(content, digest_size=16).hexdigest()}"
+
+
+def frame_key(frame: np.ndarray, model_name: str) -> str:
+    """
+    Cache key for a webcam frame
+    
+    Hashes a quantized 32x32 grayscale thumbnail so that near-duplicate
+    frames (static scene, sensor noise) map to the same key.
+    
+    Args:
+        frame: BGR frame
+        model_name: Model the detections belong to
+        
+    Returns:
+        str: Cache key
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA) >> 3
+    return f"frame:{model_name}:{hashlib.blake2b(thumb.tobytes(), digest_size=16).hexdigest()}"
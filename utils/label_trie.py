@@ -0,0 +1,74 @@
+"""
+Word-level trie for clothing class labels
+Maps class names (and their variants) onto canonical compliance labels
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+
+
+def normalize_words(name: str) -> List[str]:
+    """
+    Split a class name into normalized words
+
+    Lowercases, treats punctuation as a word break and collapses whitespace,
+    so "T-Shirt", "t shirt" and " T  SHIRT " all become ["t", "shirt"].
+    """
+    return _PUNCTUATION.sub(" ", name.lower()).split()
+
+
+class TrieNode:
+    """Single word in the trie; `label` is set when a full entry ends here"""
+
+    __slots__ = ("children", "label")
+
+    def __init__(self):
+        self.children: Dict[str, "TrieNode"] = {}
+        self.label: Optional[str] = None
+
+
+class LabelTrie:
+    """Trie keyed by normalized words, resolving names to canonical labels"""
+
+    def __init__(self):
+        self.root = TrieNode()
+
+    def insert(self, name: str, label: str):
+        """Insert a name that should resolve to `label`"""
+        node = self.root
+        for word in normalize_words(name):
+            node = node.children.setdefault(word, TrieNode())
+        node.label = label
+
+    def longest_prefix_match(self, name: str) -> Optional[str]:
+        """
+        Resolve a class name to its canonical label
+
+        Walks the trie word by word and returns the label of the longest
+        entry that is a prefix of `name`, or None if nothing matches.
+        """
+        node = self.root
+        match = None
+        for word in normalize_words(name):
+            node = node.children.get(word)
+            if node is None:
+                break
+            if node.label is not None:
+                match = node.label
+        return match
+
+
+def build_trie(variants: Dict[str, Iterable[str]]) -> LabelTrie:
+    """
+    Build a trie from a {canonical_label: [variants]} mapping
+
+    Each canonical label is inserted alongside its variants.
+    """
+    trie = LabelTrie()
+    for label, names in variants.items():
+        trie.insert(label, label)
+        for name in names:
+            trie.insert(name, label)
+    return trie
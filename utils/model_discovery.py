@@ -4,11 +4,13 @@ Automatically discovers and loads YOLO models from the models folder
 """
 
 import os
+import time
 import logging
-from pathlib import Path
 from typing import Dict, List, Optional
 from ultralytics import YOLO
 
+from config import MODEL_DISCOVERY_TTL_SECONDS
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,6 +21,10 @@ class ModelDiscovery:
         self.models_folder = models_folder
         self._models_cache = {}
         self._classes_cache = {}
+        self._lc_index = {}  # Lowercased model id -> model id
+        self._names_csv = ""  # "id1, id2, ..." for error messages
+        self._folder_mtime = None  # Folder mtime at last discovery
+        self._checked_at = None  # time.monotonic() of the last freshness check
         
     def discover_models(self) -> Dict[str, Dict]:
         """
@@ -33,45 +39,76 @@ class ModelDiscovery:
             logger.warning(f"Models folder not found: {self.models_folder}")
             return models
         
-        # Find all .pt files
-        model_files = Path(self.models_folder).glob("*.pt")
+        self._folder_mtime = os.stat(self.models_folder).st_mtime
         
-        for model_path in model_files:
-            model_id = model_path.stem  # filename without extension
-            
+        for model_id, path, size, mtime in self._scan_model_files():
             try:
                 # Load model to get classes
-                classes = self._get_model_classes(str(model_path))
+                classes = self._get_model_classes(path, mtime)
                 
                 models[model_id] = {
                     "id": model_id,
-                    "path": str(model_path),
+                    "path": path,
                     "classes": classes,
-                    "class_count": len(classes)
+                    "class_count": len(classes),
+                    "size_bytes": size
                 }
                 
                 logger.info(f"Discovered model: {model_id} ({len(classes)} classes)")
                 
             except Exception as e:
-                logger.error(f"Error loading model {model_path}: {e}")
+                logger.error(f"Error loading model {path}: {e}")
                 continue
         
         self._models_cache = models
+        self._lc_index = {model_id.lower(): model_id for model_id in models}
+        self._names_csv = ", ".join(models)
         return models
     
-    def _get_model_classes(self, model_path: str) -> List[str]:
+    def _scan_model_files(self):
+        """
+        Yield (model_id, path, size_bytes, mtime) for each .pt file in the models folder
+        
+        Uses os.scandir so file type and stat come from the directory listing
+        instead of a separate stat call per file.
+        """
+        with os.scandir(self.models_folder) as entries:
+            for entry in entries:
+                if entry.name.endswith(".pt") and entry.is_file(follow_symlinks=False):
+                    stat = entry.stat()
+                    yield entry.name[:-3], entry.path, stat.st_size, stat.st_mtime
+    
+    def _ensure_fresh(self):
+        """Re-discover models if nothing is cached or the models folder changed"""
+        # Polling endpoints call this constantly; only stat the folder once per TTL
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < MODEL_DISCOVERY_TTL_SECONDS:
+            return
+        self._checked_at = now
+        
+        try:
+            mtime = os.stat(self.models_folder).st_mtime
+        except OSError:
+            mtime = None
+        
+        if self._folder_mtime is None or mtime != self._folder_mtime:
+            self.discover_models()
+    
+    def _get_model_classes(self, model_path: str, mtime: float = None) -> List[str]:
         """
         Extract class names from a YOLO model
         
         Args:
             model_path: Path to .pt model file
+            mtime: Optional file mtime so replaced files are re-read
             
         Returns:
             List of class names
         """
         # Check cache first
-        if model_path in self._classes_cache:
-            return self._classes_cache[model_path]
+        cache_key = (model_path, mtime)
+        if cache_key in self._classes_cache:
+            return self._classes_cache[cache_key]
         
         try:
             model = YOLO(model_path)
@@ -79,7 +116,7 @@ class ModelDiscovery:
             if hasattr(model, 'names') and model.names:
                 # YOLO model.names is a dict {id: name}
                 classes = [name for name in model.names.values()]
-                self._classes_cache[model_path] = classes
+                self._classes_cache[cache_key] = classes
                 return classes
             else:
                 logger.warning(f"Model {model_path} has no class names")
@@ -99,22 +136,50 @@ class ModelDiscovery:
         Returns:
             Model metadata dict or None if not found
         """
-        if not self._models_cache:
-            self.discover_models()
+        self._ensure_fresh()
         
         return self._models_cache.get(model_id)
     
+    def list_model_ids(self) -> List[str]:
+        """
+        List model ids from the models folder without loading any model
+        
+        Returns:
+            List of model identifiers, in discovery order
+        """
+        if not os.path.exists(self.models_folder):
+            return []
+        return [model_id for model_id, _, _, _ in self._scan_model_files()]
+    
+    def resolve_model_id(self, name: str) -> Optional[str]:
+        """
+        Find a discovered model by case-insensitive id
+        
+        Args:
+            name: Model name as given by the client
+            
+        Returns:
+            Matching model id or None if not found
+        """
+        self._ensure_fresh()
+        
+        return self._lc_index.get(name.lower())
+    
+    def model_names_csv(self) -> str:
+        """Comma-separated ids of the discovered models (built once per discovery)"""
+        self._ensure_fresh()
+        
+        return self._names_csv
+    
     def get_all_models(self) -> Dict[str, Dict]:
         """Get all discovered models"""
-        if not self._models_cache:
-            self.discover_models()
+        self._ensure_fresh()
         
         return self._models_cache
     
     def model_exists(self, model_id: str) -> bool:
         """Check if a model exists"""
-        if not self._models_cache:
-            self.discover_models()
+        self._ensure_fresh()
         
         return model_id in self._models_cache
     
@@ -130,8 +195,7 @@ class ModelDiscovery:
         Returns:
             Sorted list of unique class names
         """
-        if not self._models_cache:
-            self.discover_models()
+        self._ensure_fresh()
         
         all_classes = set()
         for model_info in self._models_cache.values():
@@ -150,9 +214,13 @@ class ModelDiscovery:
 _model_discovery = None
 
 def get_model_discovery(models_folder: str = "models") -> ModelDiscovery:
-    """Get singleton instance of ModelDiscovery"""
+    """
+    Get singleton instance of ModelDiscovery
+    
+    Discovery itself is deferred to the first lookup, so this is cheap
+    enough to call at import time.
+    """
     global _model_discovery
     if _model_discovery is None:
         _model_discovery = ModelDiscovery(models_folder)
-        _model_discovery.discover_models()
     return _model_discovery
@@ -0,0 +1,31 @@
+"""
+Perceptual frame hashing
+Lets the webcam loop skip detection when the scene has not changed
+"""
+
+import cv2
+import numpy as np
+
+
+def dhash(frame: np.ndarray) -> int:
+    """
+    Compute a 64-bit difference hash of a frame
+
+    The frame is shrunk to a 9x8 grayscale thumbnail and each bit records
+    whether a pixel is brighter than its right-hand neighbour.
+
+    Args:
+        frame: BGR or grayscale image
+
+    Returns:
+        int: 64-bit hash
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = thumb[:, 1:] > thumb[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (hash_a ^ hash_b).bit_count()
@@ -0,0 +1,86 @@
+"""
+Threaded pipeline stages
+Runs an iterator on its own thread so consecutive stages of a stream overlap
+"""
+
+import logging
+import queue
+import threading
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class _StageError:
+    """Carries an exception raised by the producer over to the consumer"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class ThreadedIterator:
+    """
+    Iterate over a source on a background thread through a bounded queue
+
+    The producer runs at most maxsize items ahead of the consumer, so the
+    queue bounds both memory and latency; once it is full the producer
+    blocks (upstream stages decide what to drop). Exceptions raised by the
+    source are re-raised from the consumer's next().
+    """
+
+    _DONE = object()
+
+    def __init__(self, source: Iterable, maxsize: int = 2, name: str = "PipelineStage"):
+        """
+        Start the stage
+
+        Args:
+            source: Iterable to drain on the background thread
+            maxsize: Maximum items buffered between the two threads
+            name: Thread name (shows up in logs and profilers)
+        """
+        self._source = iter(source)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def __iter__(self) -> "ThreadedIterator":
+        return self
+
+    def __next__(self):
+        item = self._queue.get()
+        if item is self._DONE:
+            raise StopIteration
+        if isinstance(item, _StageError):
+            raise item.error
+        return item
+
+    def close(self, timeout: float = 2.0):
+        """Stop the producer thread and close the source"""
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+
+    def _run(self):
+        try:
+            for item in self._source:
+                if not self._put(item):
+                    break
+        except Exception as e:
+            logger.error(f"Pipeline stage {self._thread.name} failed: {e}", exc_info=True)
+            self._put(_StageError(e))
+        finally:
+            close = getattr(self._source, "close", None)
+            if close is not None:
+                close()
+            self._put(self._DONE)
+
+    def _put(self, item) -> bool:
+        """Block until the item is queued; False if the consumer closed the stage"""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,63 @@
+"""
+Process-pool inference for CPU-only deployments
+Each worker process owns its own DressDetector so YOLO runs outside the GIL
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Detector owned by this worker process (set by _init_worker)
+_worker_detector = None
+
+
+def _init_worker():
+    """Load the detector once when a worker process starts"""
+    global _worker_detector
+    from detector import DressDetector
+    _worker_detector = DressDetector()
+    logger.info(f"Inference worker ready with model '{_worker_detector.current_model}'")
+
+
+def _run_detect(image: np.ndarray, model_name: Optional[str], confidence_threshold: float):
+    """Run detection in a worker, switching to the requested model first if needed"""
+    if model_name and model_name != _worker_detector.current_model:
+        _worker_detector.switch_model(model_name)
+    return _worker_detector.detect(image, confidence_threshold=confidence_threshold)
+
+
+def create_inference_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Create a process pool whose workers each hold a loaded detector
+
+    Args:
+        workers: Number of worker processes
+
+    Returns:
+        ProcessPoolExecutor: Pool to submit run_detect calls to
+    """
+    logger.info(f"Starting {workers} inference worker processes")
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+
+async def detect_in_pool(pool: ProcessPoolExecutor, image: np.ndarray,
+                         model_name: Optional[str], confidence_threshold: float = 0.25):
+    """
+    Run detection in the process pool without blocking the event loop
+
+    Args:
+        pool: Pool created by create_inference_pool
+        image: Input image as numpy array
+        model_name: Model the caller expects (workers follow model switches lazily)
+        confidence_threshold: Minimum confidence for detections
+
+    Returns:
+        list: Detection dictionaries
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, _run_detect, image, model_name, confidence_threshold)
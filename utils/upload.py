@@ -0,0 +1,261 @@
+"""
+Streaming upload reader for /detect/
+Validates size, extension and file signature while the request body is still arriving
+"""
+
+import asyncio
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import Executor
+from typing import Callable, Iterable, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from utils.image_io import sniff_image_type
+
+logger = logging.getLogger(__name__)
+
+# Optional: parse multipart bodies incrementally straight from request.stream()
+try:
+    from streaming_form_data import StreamingFormDataParser
+    from streaming_form_data.targets import BaseTarget
+    STREAMING_FORM_DATA_AVAILABLE = True
+except ImportError:
+    STREAMING_FORM_DATA_AVAILABLE = False
+
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Read size for the UploadFile fallback path
+MULTIPART_OVERHEAD = 16 * 1024  # Allowance for boundaries, part headers and other form fields
+
+
+class BufferPool:
+    """
+    Reusable fixed-size bytearrays for upload bodies
+
+    Buffers are allocated lazily and kept for reuse, so steady-state uploads
+    write into pages that are already resident instead of growing a fresh
+    bytes object per request. When the pool is empty a new buffer is
+    allocated rather than blocking the request.
+    """
+
+    def __init__(self, buffer_size: int, max_buffers: int):
+        """
+        Initialize pool
+
+        Args:
+            buffer_size: Size of each buffer in bytes (the upload size limit)
+            max_buffers: Maximum number of idle buffers kept for reuse
+        """
+        self.buffer_size = buffer_size
+        self._idle = queue.Queue(maxsize=max_buffers)
+
+    def acquire(self) -> bytearray:
+        """Take an idle buffer, or allocate one if none is free"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return bytearray(self.buffer_size)
+
+    def release(self, buf: bytearray):
+        """Return a buffer for reuse (dropped if the pool is already full)"""
+        try:
+            self._idle.put_nowait(buf)
+        except queue.Full:
+            pass
+
+
+class UploadBuffer:
+    """Collects an uploaded file, rejecting it as soon as a limit is broken"""
+
+    def __init__(self, max_size: int, allowed_extensions: Iterable[str],
+                 pool: Optional[BufferPool] = None):
+        """
+        Initialize buffer
+
+        Args:
+            max_size: Maximum file size in bytes
+            allowed_extensions: Accepted extensions including the dot (e.g. ".jpg")
+            pool: Pool to borrow the backing buffer from (None = allocate one)
+        """
+        self.max_size = max_size
+        self.allowed_extensions = allowed_extensions
+        self._pool = pool if pool is not None and pool.buffer_size >= max_size else None
+        self._buf = self._pool.acquire() if self._pool else bytearray(max_size)
+        self._view = memoryview(self._buf)
+        self.length = 0
+        self._magic_checked = False
+        self._lock = threading.Lock()
+        self._readers = 0  # Executor jobs still reading content
+        self._release_pending = False
+
+    @property
+    def content(self) -> memoryview:
+        """Zero-copy view of the bytes received so far (valid until release())"""
+        return self._view[:self.length]
+
+    def check_filename(self, filename: Optional[str]):
+        """Reject files whose extension is not allowed (HTTP 400)"""
+        ext = os.path.splitext(filename or "")[1].lower()
+        if ext not in self.allowed_extensions:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid file type. Allowed: {', '.join(sorted(self.allowed_extensions))}"
+            )
+
+    def feed(self, chunk: bytes):
+        """Append a chunk, enforcing the size limit (413) and signature check (415)"""
+        end = self.length + len(chunk)
+        if end > self.max_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum size: {self.max_size / (1024*1024)}MB"
+            )
+        self._view[self.length:end] = chunk
+        self.length = end
+        if not self._magic_checked and self.length >= 12:
+            self._check_magic()
+
+    def finish(self) -> memoryview:
+        """Run the final checks and return the file content"""
+        if not self._magic_checked:
+            self._check_magic()
+        return self.content
+
+    def run_reader(self, executor: Executor, fn: Callable, *args) -> asyncio.Future:
+        """
+        Run fn(*args) on an executor while keeping the buffer out of the pool
+
+        A worker thread keeps running after the task awaiting it is cancelled,
+        so release() defers handing the buffer back until every job started
+        here has actually finished reading content.
+
+        Args:
+            executor: Executor to run fn on
+            fn: Callable that reads content
+            *args: Arguments for fn
+
+        Returns:
+            asyncio.Future: Awaitable result of fn
+        """
+        with self._lock:
+            self._readers += 1
+        future = executor.submit(fn, *args)
+        future.add_done_callback(self._reader_done)
+        return asyncio.wrap_future(future)
+
+    def release(self):
+        """Hand the backing buffer back to its pool once no reader is still running"""
+        with self._lock:
+            self._release_pending = True
+            if self._readers:
+                return
+        self._return_buffer()
+
+    def _reader_done(self, _future):
+        with self._lock:
+            self._readers -= 1
+            if self._readers or not self._release_pending:
+                return
+        self._return_buffer()
+
+    def _return_buffer(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.release(self._buf)
+
+    def _check_magic(self):
+        if sniff_image_type(self._view[:12]) is None:
+            raise HTTPException(status_code=415, detail="File content is not a supported image")
+        self._magic_checked = True
+
+
+if STREAMING_FORM_DATA_AVAILABLE:
+    class _ChunkTarget(BaseTarget):
+        """streaming-form-data target that just keeps the latest chunks for the caller"""
+
+        def __init__(self):
+            super().__init__()
+            self.pending = []
+
+        def on_data_received(self, chunk: bytes):
+            self.pending.append(chunk)
+
+
+async def read_upload(request: Request, max_size: int, allowed_extensions: Iterable[str],
+                      field: str = "file", pool: Optional[BufferPool] = None) -> Tuple[str, UploadBuffer]:
+    """
+    Read one file field from a multipart request
+
+    With streaming-form-data installed the multipart body is parsed chunk by
+    chunk from request.stream(), so limits are enforced before the whole body
+    is received and no intermediate spooled file is created. Otherwise the
+    form is parsed by Starlette and the file read in chunks.
+
+    Args:
+        request: Incoming request
+        max_size: Maximum file size in bytes
+        allowed_extensions: Accepted extensions including the dot
+        field: Name of the multipart file field
+        pool: Buffer pool the upload is written into
+
+    Returns:
+        tuple: (filename, upload) - read the bytes from upload.content and
+               call upload.release() once they are no longer needed
+    """
+    # Reject oversized bodies from the declared length, before reading or allocating anything
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size + MULTIPART_OVERHEAD:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size: {max_size / (1024*1024)}MB"
+        )
+
+    upload = UploadBuffer(max_size, allowed_extensions, pool)
+    try:
+        filename = await _read_into(request, upload, field)
+    except BaseException:
+        upload.release()
+        raise
+    return filename, upload
+
+
+async def _read_into(request: Request, upload: UploadBuffer, field: str) -> str:
+    """Parse the multipart body into upload; returns the client filename"""
+    if STREAMING_FORM_DATA_AVAILABLE:
+        target = _ChunkTarget()
+        parser = StreamingFormDataParser(headers=request.headers)
+        parser.register(field, target)
+        filename_checked = False
+
+        async for body_chunk in request.stream():
+            parser.data_received(body_chunk)
+            if target.pending:
+                if not filename_checked:
+                    upload.check_filename(target.multipart_filename)
+                    filename_checked = True
+                for chunk in target.pending:
+                    upload.feed(chunk)
+                target.pending.clear()
+
+        if not filename_checked:
+            raise HTTPException(status_code=400, detail=f"Missing file field '{field}'")
+        upload.finish()
+        return target.multipart_filename
+
+    form = await request.form()
+    try:
+        file = form.get(field)
+        if file is None or not hasattr(file, "read"):
+            raise HTTPException(status_code=400, detail=f"Missing file field '{field}'")
+
+        upload.check_filename(file.filename)
+        await file.seek(0)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            upload.feed(chunk)
+        upload.finish()
+        return file.filename
+    finally:
+        # Closes the spooled temp files Starlette created for the form's files
+        await form.close()
@@ -11,6 +11,8 @@ import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import threading
 
+from utils.image_io import encode_jpeg
+
 logger = logging.getLogger(__name__)
 
 class ViolationLogger:
@@ -123,6 +125,45 @@ class ViolationLogger:
         del self.logged_today[person_name]
         self._save_daily_logs()
     
+    def check_and_delete(self, person_name: str) -> tuple[bool, bool]:
+        """
+        Check whether a person was logged today and, if so, delete that log
+        
+        Combines _is_person_logged_today and _delete_previous_log so the
+        tracking entry is looked up once. Only the in-memory entry is removed
+        here; deleting the image and rewriting the daily logs file run on the
+        logger's thread pool so the webcam loop never waits on disk.
+        
+        Args:
+            person_name: Person to check
+            
+        Returns:
+            tuple: (was_logged_today, deleted)
+        """
+        with self.lock:
+            log_info = self.logged_today.pop(person_name, None)
+        if log_info is None:
+            return False, False
+        
+        if log_info.get("date") != date.today().isoformat():
+            # Stale entry from a previous day - drop it without touching its image
+            return False, False
+        
+        self.executor.submit(self._remove_log_files, log_info.get("filepath"))
+        return True, True
+    
+    def _remove_log_files(self, filepath: Optional[str]):
+        """Delete a dropped log's image and persist the tracking change (runs in thread pool)"""
+        if filepath and os.path.exists(filepath):
+            try:
+                os.remove(filepath)
+                logger.info(f"Deleted previous violation image: {filepath}")
+            except Exception as e:
+                logger.error(f"Error deleting previous image {filepath}: {e}")
+        
+        with self.lock:
+            self._save_daily_logs()
+    
     def replace_unknown_with_identified(self, identified_name: str, items: List[str], new_filepath: str):
         """
         Replace an 'Unknown' log entry with identified person's details.
@@ -391,8 +432,12 @@ class ViolationLogger:
             # Add metadata overlay
             annotated_frame = self._add_metadata_overlay(annotated_frame, compliance_info, face_results, timestamp)
             
-            # Save the frame (I/O operation)
-            cv2.imwrite(filepath, annotated_frame)
+            # Save the frame (I/O operation); TurboJPEG when available, same quality as cv2.imwrite's default
+            jpeg_bytes = encode_jpeg(annotated_frame, 95)
+            if jpeg_bytes is None:
+                raise RuntimeError("JPEG encoding failed")
+            with open(filepath, "wb") as f:
+                f.write(jpeg_bytes)
             
             # Mark identified persons as logged today (with lock for thread safety)
             with self.lock:
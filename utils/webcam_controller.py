@@ -0,0 +1,112 @@
+"""
+Webcam stream ownership
+Tracks the selected camera and the running stream so HTTP handlers and the
+streaming thread never race on a shared capture object
+"""
+
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+import cv2
+
+from utils.frame_grabber import open_camera
+
+logger = logging.getLogger(__name__)
+
+
+class WebcamSession:
+    """One running stream: its capture plus stop/stopped signals"""
+
+    def __init__(self, cap: cv2.VideoCapture):
+        self.cap = cap
+        self.stop_event = threading.Event()     # Set by whoever wants the stream to end
+        self.stopped_event = threading.Event()  # Set by the stream once the camera is released
+
+    def should_stop(self) -> bool:
+        """True once a stop was requested"""
+        return self.stop_event.is_set()
+
+
+@dataclass
+class WebcamController:
+    """
+    Owns the webcam stream lifecycle
+
+    Only the stream that opened a capture releases it; everyone else asks it
+    to stop and waits on its stopped_event, so the camera is never released
+    twice or while the capture thread is still reading from it.
+    """
+
+    camera_index: int = 0
+    session: Optional[WebcamSession] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def active(self) -> bool:
+        """Whether a stream currently holds the camera"""
+        return self.session is not None
+
+    def start(self, timeout: float = 2.0) -> Optional[WebcamSession]:
+        """
+        Stop any running stream and open the selected camera (blocking)
+
+        Args:
+            timeout: Seconds to wait for a previous stream to release the camera
+
+        Returns:
+            WebcamSession: New session, or None if the camera could not be opened
+                           or a previous stream still holds it
+        """
+        if not self.stop_blocking(timeout):
+            logger.error("Previous webcam stream still holds the camera; not opening it again")
+            return None
+        with self.lock:
+            # Another start() may have claimed the camera while we waited
+            if self.session is not None:
+                logger.error("Webcam is already in use by another stream")
+                return None
+            cap = open_camera(self.camera_index)
+            if not cap.isOpened():
+                cap.release()
+                return None
+            self.session = WebcamSession(cap)
+            return self.session
+
+    def finish(self, session: WebcamSession):
+        """Release a session's camera; called by the stream that owns it"""
+        session.cap.release()
+        with self.lock:
+            if self.session is session:
+                self.session = None
+        session.stopped_event.set()
+
+    def request_stop(self) -> Optional[WebcamSession]:
+        """Signal the running stream to stop without waiting"""
+        with self.lock:
+            session = self.session
+        if session is not None:
+            session.stop_event.set()
+        return session
+
+    def stop_blocking(self, timeout: float = 2.0) -> bool:
+        """
+        Stop the running stream and wait for it to release the camera
+
+        Returns:
+            bool: False if the stream did not finish within timeout
+        """
+        session = self.request_stop()
+        if session is None or session.stopped_event.wait(timeout):
+            return True
+        logger.warning(f"Webcam stream did not stop within {timeout}s")
+        return False
+
+    async def stop(self, timeout: float = 2.0) -> bool:
+        """Async stop_blocking: waits for the stream off the event loop"""
+        if self.session is None:
+            return True
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.stop_blocking, timeout)